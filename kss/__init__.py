@@ -7,7 +7,25 @@
 # This software may be modified and distributed under the terms
 # of the BSD license.  See the LICENSE file for details.
 
-from kss.kss import split_chunks, split_sentences
+from kss.cache import MemoryCache, MorphCache, SqliteCache
+from kss.kss import (
+    Splitter,
+    available_backends,
+    iter_sentences,
+    split_chunks,
+    split_sentences,
+    split_sentences_with_offsets,
+)
 
-__ALL__ = [split_sentences, split_chunks]
+__ALL__ = [
+    split_sentences,
+    split_sentences_with_offsets,
+    split_chunks,
+    iter_sentences,
+    available_backends,
+    Splitter,
+    MemoryCache,
+    MorphCache,
+    SqliteCache,
+]
 __version__ = "3.7.3"
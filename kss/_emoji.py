@@ -5,8 +5,19 @@ _emojis = {}
 for lang in ["pt", "it", "es", "en"]:
     _emojis.update(emoji.UNICODE_EMOJI[lang])
 
+unicodes = ["\u200d"]  # zero width joiner
+unicodes += [chr(c) for c in range(0xFE00, 0xFE10)]  # variation_selectors 1~16
+
+# characters which make a grapheme an emoji, most texts have none of them.
+_emoji_chars = frozenset(e for e in _emojis if len(e) == 1).union(
+    chr(c) for c in range(0x1F1E6, 0x1F200)
+)
+
 
 def get_emoji(text):
+    if _emoji_chars.isdisjoint(text):
+        return []
+
     emoji_list = []
     flags = regex.findall("[\U0001F1E6-\U0001F1FF]", text)
 
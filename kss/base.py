@@ -12,14 +12,14 @@
 import functools
 import re
 import logging
+from array import array
+from itertools import repeat
 from typing import List
 
+from kss._emoji import get_emoji
 from kss.morph import MorphExtractor
-from kss.pynori.dict.character_definition import (
-    get_emoji,
-    categories,
-)
-from kss.rule import Table, Stats, unicodes
+from kss.pynori.dict.character_definition import get_char_ranges
+from kss.rule import ID, Symbol, Table, Stats, before, jyo, unicodes, yo
 
 logging.basicConfig(
     format="[Korean Sentence Splitter]: %(message)s", level=logging.WARNING
@@ -195,19 +195,246 @@ class Const:
     pattern_space = re.compile(r"\s+")
 
 
-class Eojeol:
-    eojeol: str
-    pos: str
-
-    def __init__(self, eojeol: str = "", pos: str = "TEMP"):
-        self.eojeol = eojeol
-        self.pos = pos
+class TransitionTable(object):
+    """
+    Dense integer version of `Table` and symbol sets of `Const` for the rule state machine.
+
+    Every character used by the rules has a small class id (0 for the others),
+    so a character costs one dict lookup and the rules are checked by array indexing.
+    `Table` remains the authoring format, and it is compiled once at import.
+
+    Attributes:
+        classes (dict): character to class id
+        symbols (array): `Symbol` flags of each class id
+        transitions (List[array]): `ID` flags of each class id for each state of `Stats`
+        endings (Dict[Tuple[bool, bool], array]): state started by the heuristic rule of each class id
+            (`DA_*`, `YO`, `JYO` or `DEFAULT`) for each (use_heuristic, use_morpheme)
+        candidates (Dict[bool, re.Pattern]): characters which can leave the default state
+            without morpheme features for each use_heuristic
+    """
+
+    def __init__(self):
+        symbol_sets = [
+            (Symbol.SPACE, [" "]),
+            (Symbol.DOUBLE_QUOTE, Const.double_quotes),
+            (Symbol.SINGLE_QUOTE, Const.single_quotes),
+            (Symbol.BRACKET, Const.brackets),
+            (Symbol.SB, [".", "!", "?", "…", "~"]),
+            (Symbol.DA, ["다"]),
+            (Symbol.YO, ["요"]),
+            (Symbol.JYO, ["죠", "쥬", "죵"]),
+            (Symbol.ENDPOINT, Const.endpoint),
+            (Symbol.NOT_ENDPOINT, Const.not_endpoint),
+            (Symbol.COMMON, list(Table[Stats.COMMON].keys())),
+        ]
+        states = [
+            value
+            for key, value in vars(Stats).items()
+            if not key.startswith("_") and isinstance(value, int)
+        ]
 
-    def __str__(self):
-        return f"({self.eojeol}, {self.pos})"
+        # eojeols are single characters (or empty for the initial eojeol)
+        chars = {c for _, symbols in symbol_sets for c in symbols}
+        chars |= {c for state in states for c in self._rules(state).keys()}
+        chars = sorted(c for c in chars if len(c) <= 1)
+
+        self.classes = {c: i + 1 for i, c in enumerate(chars)}
+        self.symbols = array("H", [Symbol.NONE] * (len(chars) + 1))
+        self.transitions = [array("B", [ID.NONE] * (len(chars) + 1)) for _ in range(max(states) + 1)]
+
+        for flag, symbols in symbol_sets:
+            for c in symbols:
+                if c in self.classes:
+                    self.symbols[self.classes[c]] |= flag
+
+        for state in states:
+            for c, flags in self._rules(state).items():
+                if c in self.classes:
+                    self.transitions[state][self.classes[c]] = flags
+
+        self.endings = {}
+        for use_morpheme in [True, False]:
+            endings = array("B", [Stats.DEFAULT] * (len(chars) + 1))
+            for cls, symbol in enumerate(self.symbols):
+                if symbol & Symbol.DA:
+                    endings[cls] = Stats.DA_MORPH if use_morpheme else Stats.DA_EOJEOL
+                elif symbol & Symbol.YO:
+                    endings[cls] = Stats.YO
+                elif symbol & Symbol.JYO:
+                    endings[cls] = Stats.JYO
+
+            self.endings[True, use_morpheme] = endings
+            self.endings[False, use_morpheme] = array("B", [Stats.DEFAULT]) * len(endings)
+
+        self.candidates = {}
+        for use_heuristic in [True, False]:
+            endings = self.endings[use_heuristic, False]
+            chars = [
+                c
+                for c, cls in self.classes.items()
+                if self.symbols[cls] & Symbol.SB or endings[cls]
+            ]
+            self.candidates[use_heuristic] = re.compile(
+                f"[{''.join(re.escape(c) for c in sorted(chars))}]"
+            )
 
-    def __repr__(self):
-        return f"('{self.eojeol}', {self.pos})"
+    @staticmethod
+    def _rules(state):
+        # avoid inserting a missing state into `Table`
+        return Table[state] if state in Table else {}
+
+    def classify(self, text):
+        """
+        Get class ids of characters.
+
+        Args:
+            text (str): concatenated eojeols
+
+        Returns:
+            List[int]: list of class ids
+        """
+        return list(map(self.classes.get, text, repeat(0, len(text))))
+
+
+class Pos(object):
+    """Flags of part of speech tags which are checked by the rules."""
+
+    NONE: int = 0
+    EF: int = 1 << 0
+    ETN: int = 1 << 1
+    EC: int = 1 << 2
+    VC: int = 1 << 3
+    J: int = 1 << 4
+    XSN: int = 1 << 5
+    SP: int = 1 << 6
+    SE: int = 1 << 7
+    SF: int = 1 << 8
+    SY: int = 1 << 9
+
+
+@functools.lru_cache(maxsize=None)
+def get_pos_mask(tag: str) -> int:
+    """
+    Get `Pos` flags of a part of speech tag.
+    A flag is set if its name is a part of the tag. (e.g. 'VV+EF' has `Pos.EF`)
+
+    Args:
+        tag (str): part of speech tag of morpheme analyzer
+
+    Returns:
+        int: `Pos` flags
+    """
+    mask = Pos.NONE
+    for name, flag in vars(Pos).items():
+        if not name.startswith("_") and name in tag:
+            mask |= flag
+    return mask
+
+
+class Tokens(object):
+    """
+    Columnar result of morpheme analysis.
+    `text[i]` is the i-th eojeol (one character) and `tags[i]` is `Pos` flags of it.
+
+    Args:
+        text (str): concatenated eojeols
+        tags (array): `Pos` flags of each eojeol
+    """
+
+    __slots__ = ("text", "tags")
+
+    def __init__(self, text: str = "", tags: array = None):
+        self.text = text
+        self.tags = tags if tags is not None else array("H")
+
+    @classmethod
+    def from_text(cls, text: str, tag: str):
+        return cls(text, array("H", [get_pos_mask(tag)]) * len(text))
+
+    @classmethod
+    def from_pos(cls, pos):
+        texts, tags = [], []
+        for token, tag in pos:
+            texts.append(token)
+            tags += [get_pos_mask(tag)] * len(token)
+        return cls("".join(texts), array("H", tags))
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, item: slice):
+        return Tokens(self.text[item], self.tags[item])
+
+
+def pos_with_cache(text: str, backend: str, cache, context: int = 1) -> Tokens:
+    """
+    Run morpheme analyzer only on the eojeols missed in the cache.
+
+    Each run of missed eojeols is analyzed with `context` eojeols on both sides, overlapping windows are merged,
+    and the flags of the missed eojeols are put into the cache. A text with spaces which the analyzer
+    doesn't keep (leading, trailing or repeated) is analyzed at once without the cache.
+
+    Args:
+        text (str): input text
+        backend (str): morpheme analyzer backend
+        cache (MorphCache): cache of analyzed eojeols
+        context (int): number of eojeols analyzed together on each side of a missed run
+
+    Returns:
+        Tokens: tokens of the whole text
+    """
+    if len(text) == 0 or text.strip() != text or "  " in text:
+        return _morph.pos(text=text, backend=backend)
+
+    eojeols = text.split(" ")
+    starts, start = [], 0
+    for eojeol in eojeols:
+        starts.append(start)
+        start += len(eojeol) + 1
+
+    keys, values, windows = [], [], []
+    for i, eojeol in enumerate(eojeols):
+        key = cache.key(
+            backend,
+            eojeol,
+            eojeols[i - 1] if i > 0 else "",
+            eojeols[i + 1] if i + 1 < len(eojeols) else "",
+        )
+        value = cache.get(key)
+        keys.append(key)
+        values.append(value)
+
+        if value is None:
+            start, end = max(i - context, 0), min(i + context + 1, len(eojeols))
+            if len(windows) != 0 and start <= windows[-1][1]:
+                windows[-1][1] = end
+            else:
+                windows.append([start, end])
+
+    # an eojeol missed twice takes the first analysis, same as it is found in the cache.
+    analyzed = {}
+    for start, end in windows:
+        window = " ".join(eojeols[start:end])
+        tokens = _morph.pos(text=window, backend=backend)
+        if tokens.text != window:
+            # analyzer changed the text, offsets can't be matched.
+            return _morph.pos(text=text, backend=backend)
+
+        for i in range(start, end):
+            if values[i] is None:
+                if keys[i] not in analyzed:
+                    offset = starts[i] - starts[start]
+                    analyzed[keys[i]] = tokens.tags[offset : offset + len(eojeols[i])]
+                values[i] = analyzed[keys[i]]
+
+    for key, value in analyzed.items():
+        cache.put(key, value)
+
+    tags = array("H", [get_pos_mask("SP")]) * len(text)
+    for start, value in zip(starts, values):
+        tags[start : start + len(value)] = value
+
+    return Tokens(text, tags)
 
 
 @functools.lru_cache(maxsize=2)
@@ -224,53 +451,138 @@ def get_default_backup_dict(use_morpheme):
     return {k: str(abs(hash(k))) for k in get_exceptions(use_morpheme)}
 
 
+@functools.lru_cache(maxsize=2)
+def get_default_backup_pattern(use_morpheme):
+    return compile_keywords(get_default_backup_dict(use_morpheme).keys())
+
+
+@functools.lru_cache(maxsize=8)
+def get_backup_scanner(use_morpheme, ec_cases, emojis):
+    """
+    Compile the pattern which finds every item to be processed by `Preprocessor.backup`.
+
+    Alternatives are tried in this order at each position:
+    default exceptions, ec cases (`다`, `요`, `죠` followed by a non-endpoint character),
+    zero width joiner and variation selectors.
+    """
+    branches = [f"(?P<exception>{get_default_backup_pattern(use_morpheme).pattern})"]
+
+    if ec_cases:
+        endpoint = sorted(set(e for e in Const.endpoint if len(e) == 1))
+        branches.append(f"(?P<ec>[다요죠][^{''.join(re.escape(e) for e in endpoint)}])")
+
+    if emojis:
+        branches.append(f"(?P<unicode>[{''.join(unicodes)}])")
+
+    return re.compile("|".join(branches))
+
+
+_quotes_or_brackets_pattern = re.compile(
+    f"[{''.join(re.escape(q) for q in Const.quotes_or_brackets)}]"
+)
+
+
 class Preprocessor:
     def __init__(self, use_morpheme: bool):
+        self.use_morpheme = use_morpheme
         self.backup_dict = get_default_backup_dict(use_morpheme)
+        self.backup_pattern = get_default_backup_pattern(use_morpheme)
+        self.restore_dict = {}
+        self.restore_pattern = None
 
     @staticmethod
     def tostring(eojeols):
-        return ["".join([j.eojeol for j in i]) for i in eojeols]
-
-    @staticmethod
-    def _replace(text: str, purpose_dict: dict):
-        for k, v in purpose_dict.items():
-            text = text.replace(k, v)
-
+        return ["".join(i) for i in eojeols]
+
+    def backup(
+        self,
+        text: str,
+        ec_cases: bool = False,
+        emojis: bool = False,
+        quotes: bool = False,
+    ):
+        """
+        Mask exceptions with their hash values in one scan of the text.
+
+        Args:
+            text (str): input text
+            ec_cases (bool): mask `다`, `요`, `죠` followed by a non-endpoint character
+            emojis (bool): mask emojis, zero width joiner and variation selectors
+            quotes (bool): surround quotes and brackets with zero width spaces
+
+        Returns:
+            str: masked text
+        """
+        scanner = get_backup_scanner(self.use_morpheme, ec_cases, emojis)
+
+        # emojis differ by text, so they are found by their own small pattern.
+        # the earlier match of the two patterns is taken, on a tie
+        # exceptions win and otherwise the longer one.
+        emoji_pattern = emoji = None
+        if emojis:
+            found = get_emoji(text)
+            if len(found) != 0:
+                emoji_pattern = compile_keywords(found)
+                emoji = emoji_pattern.search(text)
+
+        outputs, pos = [], 0
+        match = None
+        while True:
+            if match is None or match.start() < pos:
+                match = scanner.search(text, pos)
+            if emoji is not None and emoji.start() < pos:
+                emoji = emoji_pattern.search(text, pos)
+
+            current, kind = match, None if match is None else match.lastgroup
+            if emoji is not None and (
+                match is None
+                or emoji.start() < match.start()
+                or (
+                    emoji.start() == match.start()
+                    and kind != "exception"
+                    and emoji.end() >= match.end()
+                )
+            ):
+                current, kind = emoji, "emoji"
+
+            if current is None:
+                break
+
+            start, end = current.span()
+            key = current.group()
+            if kind == "ec" and self.backup_pattern.match(text, start + 1):
+                # exception starting at the next character is masked first.
+                outputs.append(text[pos : start + 1])
+                pos = start + 1
+                continue
+
+            val = self.backup_dict.get(key) or str(abs(hash(key)))
+            self.restore_dict[val] = key
+            outputs.append(text[pos:start])
+            outputs.append(val)
+            pos = end
+
+        outputs.append(text[pos:])
+        text = "".join(outputs)
+
+        if quotes:
+            # masked values are digits, so only unmasked symbols are surrounded.
+            text = _quotes_or_brackets_pattern.sub("\u200b\\g<0>\u200b", text)
+
+        self.restore_pattern = None
         return text
 
-    def backup(self, text: str):
-        return self._replace(text=text, purpose_dict=self.backup_dict)
-
     def restore(self, text: str):
-        return self._replace(
-            text=text,
-            purpose_dict={v: k for k, v in self.backup_dict.items()},
-        )
+        # only the items masked by `backup` can appear in the outputs.
+        if len(self.restore_dict) == 0:
+            return text
 
-    def _add_item_to_dict(self, key: str, val: str):
-        self.backup_dict[key] = val
-
-    def add_ec_cases_to_dict(self, text):
-        for i in range(0, len(text)):
-            cond1 = text[i] in ["다", "요", "죠"]
-            cond2 = i != len(text) - 1
-            if cond1 and cond2:
-                if text[i + 1] not in Const.endpoint:
-                    target_to_backup = text[i] + text[i + 1]
-                    self._add_item_to_dict(
-                        key=target_to_backup,
-                        val=str(abs(hash(target_to_backup))),
-                    )
+        if self.restore_pattern is None:
+            self.restore_pattern = compile_keywords(self.restore_dict.keys())
 
-        return text
-
-    def add_emojis_to_dict(self, text):
-        emoji_dict = {e: str(abs(hash(e))) for e in get_emoji(text)}
-        unicode_dict = {u: str(abs(hash(u))) for u in unicodes}
-        self.backup_dict.update(emoji_dict)
-        self.backup_dict.update(unicode_dict)
-        return text
+        return self.restore_pattern.sub(
+            lambda match: self.restore_dict[match.group()], text
+        )
 
 
 class Postprocessor(object):
@@ -287,54 +599,67 @@ class Postprocessor(object):
         args = (0,) + tuple(data + 1 for data in args) + (len(some_list) + 1,)
         return [some_list[start:end] for start, end in zip(args, args[1:])]
 
-    @staticmethod
-    def _find_all(a_str, sub):
-        start = 0
-        while True:
-            start = a_str.find(sub, start)
-            if start == -1:
-                return
-            yield start + len(sub) - 1
-            start += len(sub)
-
-    def _heuristic(self, results, post_processing_list):
+    def _heuristic(self, results, pattern):
         final_results = []
         for res in results:
             split_idx = []
 
-            find_quotes = False
-            for qt in Const.quotes_or_brackets:
-                if qt in res:
-                    find_quotes = True
-                    break
-
-            if not find_quotes:
-                for post in post_processing_list:
-                    if post in res:
-                        split_idx += list(self._find_all(res, post))
+            if _quotes_or_brackets_pattern.search(res) is None:
+                for match in pattern.finditer(res):
+                    # a word of `before` ends at the found space,
+                    # both of one and two characters words can be found at once.
+                    pos = match.start()
+                    if pos >= 1 and res[pos - 1] in before:
+                        split_idx.append(pos + 3)
+                    if pos >= 2 and res[pos - 2 : pos] in before:
+                        split_idx.append(pos + 3)
 
-            split_idx = sorted(split_idx)
             final_results += self._lindex_split(res, *split_idx)
 
         return final_results
 
     def apply_heuristic(self, text, results, use_morpheme):
-        from kss.rule import (
-            post_processing_da,
-            post_processing_jyo,
-            post_processing_yo,
+        pattern = get_heuristic_pattern(
+            yo_ending=self._contains(["요"], text),
+            jyo_ending=self._contains(["죠"], text),
+            da_ending=not use_morpheme and self._contains(["다"], text),
         )
 
-        if self._contains(["요"], text):
-            results = self._heuristic(results, post_processing_yo)
-        if self._contains(["죠"], text):
-            results = self._heuristic(results, post_processing_jyo)
-        if not use_morpheme and self._contains(["다"], text):
-            results = self._heuristic(results, post_processing_da)
+        if pattern is not None:
+            results = self._heuristic(results, pattern)
 
         return results
 
 
+@functools.lru_cache(maxsize=8)
+def get_heuristic_pattern(yo_ending, jyo_ending, da_ending):
+    """
+    Compile the patterns of `post_processing_yo`, `post_processing_jyo` and `post_processing_da`.
+
+    Each of them is `{before} {yo}{ending} `, so this finds the space
+    in front of `{yo}{ending} ` and `before` is checked at the found positions.
+    Matches are zero-width, so every space is found even if they are adjacent.
+
+    Returns:
+        Optional[re.Pattern]: compiled pattern or None if no ending is used
+    """
+    yo_chars = "".join(re.escape(c) for c in sorted(yo))
+    jyo_chars = "".join(re.escape(c) for c in sorted(jyo))
+
+    branches = []
+    if yo_ending:
+        branches.append(f"[{yo_chars}]요")
+    if jyo_ending:
+        branches.append(f"[{jyo_chars}]죠")
+    if da_ending:
+        branches.append(f"[{yo_chars}]다")
+
+    if len(branches) == 0:
+        return None
+
+    return re.compile(f"(?= (?:{'|'.join(branches)}) )")
+
+
 def empty(obj, dim=1) -> bool:
     assert dim in [1, 2], "only 1 or 2 dimension iterable is supported."
 
@@ -362,29 +687,53 @@ def do_push_pop_symbol(stack: List[str], symbol: str, current_ch: str):
     return current_ch
 
 
-def check_pos(pos, pos_list):
-    for target in pos_list:
-        if target in pos.pos:
-            return True
-    return False
+def compile_keywords(keywords):
+    """
+    Compile keywords into a single regex pattern.
 
+    Keywords are merged into a prefix tree, so that the pattern matches
+    the longest keyword at each position with one linear scan of the text.
 
-def replace_quotes_or_brackets_to_zwsp(eojeols):
-    results = []
-    for eojeol in eojeols:
-        item = [eojeol]
+    Args:
+        keywords (Iterable[str]): keywords to match
 
-        for s in Const.quotes_or_brackets:
-            if eojeol.eojeol == s:
-                item = [
-                    Eojeol("\u200b", "TEMP"),
-                    eojeol,
-                    Eojeol("\u200b", "TEMP"),
-                ]
+    Returns:
+        re.Pattern: compiled pattern
+    """
+    trie = {}
+    for keyword in keywords:
+        if len(keyword) == 0:
+            continue
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = None
 
-        results += item
+    def _to_regex(node):
+        branches, chars = [], []
+        for ch, child in sorted((k, v) for k, v in node.items() if k != ""):
+            if list(child.keys()) == [""]:
+                chars.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + _to_regex(child))
 
-    return results
+        if len(chars) == 1:
+            branches.append(chars[0])
+        elif len(chars) > 1:
+            branches.append(f"[{''.join(chars)}]")
+
+        regex = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{regex})?" if "" in node else regex
+
+    if len(trie) == 0:
+        # pattern that never matches
+        return re.compile(r"(?!)")
+
+    return re.compile(_to_regex(trie))
+
+
+def check_pos(tag, pos):
+    return (tag & pos) != 0
 
 
 def length_constraints(
@@ -392,8 +741,7 @@ def length_constraints(
     max_recover_length,
     max_recover_step,
 ):
-    if len(text) > max_recover_length:
-        logging.warning("Too long text! turn off quotes calibration!")
+    if max_recover_length is not None and len(text) > max_recover_length:
         max_recover_step = 0
 
     return max_recover_step
@@ -437,28 +785,77 @@ def get_num_workers(num_workers):
     return num_workers
 
 
-def remove_useless_space(text):
-    return Const.pattern_space.sub(" ", text.replace("\n", ""))
-
-
 def get_chunk_with_index(text, span):
-    text = remove_useless_space(text)
-
     if len(span) == 0:
         return None
     else:
         start = span[0][0]
         end = span[-1][1]
-        return text[start:end]
+        return preprocess_text(text[start:end])
 
 
-def preprocess_text(text):
-    total_text = "".join(
-        [c for c in text if c in _posix or len(get_emoji(c)) != 0 or c in unicodes]
+def get_sentence_offsets(text, sentences):
+    """
+    Find (start, end) spans of segmented sentences in the original text.
+
+    Sentences are matched in order with a single forward cursor, so it takes linear time.
+    Whitespaces which were normalized and characters which were dropped in preprocessing are skipped.
+
+    Args:
+        text (str): original input text
+        sentences (List[str]): segmented sentences of the text
+
+    Returns:
+        List[Tuple[int, int]]: list of sentence spans
+    """
+    offsets = []
+    cursor, length = 0, len(text)
+
+    for sentence in sentences:
+        while cursor < length and text[cursor] != sentence[0]:
+            cursor += 1
+
+        start = cursor
+
+        if text.startswith(sentence, cursor):
+            cursor += len(sentence)
+        else:
+            for char in sentence:
+                if char.isspace():
+                    while cursor < length and text[cursor].isspace():
+                        cursor += 1
+                else:
+                    while cursor < length and text[cursor] != char:
+                        cursor += 1
+                    cursor += 1
+
+        cursor = min(cursor, length)
+        offsets.append((start, cursor))
+
+    return offsets
+
+
+def build_drop_pattern():
+    """
+    Build a pattern matching the runs of characters that kss can't process.
+    (characters without any category, emoji or unicode flag in char table)
+    """
+
+    def _escape(code):
+        return f"\\U{code:08x}"
+
+    char_class = "".join(
+        _escape(first) if first == last else f"{_escape(first)}-{_escape(last)}"
+        for first, last in get_char_ranges()
     )
+    return re.compile(f"[^{char_class}]+")
 
+
+def preprocess_text(text):
+    total_text = _drop_pattern.sub("", text)
     return Const.pattern_space.sub(" ", total_text)
 
 
-_posix = list(chr(x) for x in categories.keys())
+_drop_pattern = build_drop_pattern()
 _morph = MorphExtractor()
+_table = TransitionTable()
@@ -0,0 +1,302 @@
+# Korean Sentence Splitter
+# Split Korean text into sentences using heuristic algorithm.
+#
+# Copyright (C) 2021 Hyun-Woong Ko <kevin.ko@tunib.ai> and Sang-Kil Park <skpark1224@hyundai.com>
+# All rights reserved.
+#
+# This software may be modified and distributed under the terms
+# of the BSD license.  See the LICENSE file for details.
+import hashlib
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class Cache(ABC):
+    """
+    Cache of segmented sentences.
+
+    Keys are digests of the input text and the options, so the text itself is never kept.
+    Counters are kept per process, `Splitter` adds those of its workers to its own cache.
+
+    Attributes:
+        hits (int): number of found keys
+        misses (int): number of missing keys
+        evictions (int): number of evicted entries
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(text: str, *options) -> bytes:
+        """
+        Get the key of a text split with options.
+
+        Args:
+            text (str): input text
+            *options: options which change the result
+
+        Returns:
+            bytes: 16 bytes digest
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(repr(options).encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(text.encode("utf-8", "surrogatepass"))
+        return hasher.digest()
+
+    @abstractmethod
+    def get(self, key: bytes) -> Optional[List[str]]:
+        """Get the cached sentences of a key, or None if it's missed."""
+
+    @abstractmethod
+    def put(self, key: bytes, sentences: List[str]):
+        """Cache the sentences of a key."""
+
+    def counters(self):
+        return self.hits, self.misses, self.evictions
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of found keys to all lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups != 0 else 0.0
+
+    def add_counters(self, hits, misses, evictions):
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def __getstate__(self):
+        # only the configuration is sent to worker processes
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, evictions=0)
+        return state
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions}, hit_rate={self.hit_rate:.3f})"
+        )
+
+
+class MemoryCache(Cache):
+    """
+    In-process cache which evicts the least recently used entries by total size.
+
+    Args:
+        max_bytes (int): maximum total size of the cached sentences
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        super().__init__()
+        assert isinstance(max_bytes, int), "param `max_bytes` must be `int` type"
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        value = self._lookup(key)
+        return None if value is None else list(value)
+
+    def put(self, key, sentences):
+        size = sys.getsizeof(key) + sum(sys.getsizeof(s) for s in sentences)
+        self._store(key, tuple(sentences), size)
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(entries=OrderedDict(), size=0)
+        return state
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class MorphCache(MemoryCache):
+    """
+    In-process cache of morpheme analysis per eojeol, shared by every text split with it.
+
+    An eojeol is keyed by the backend, itself and its previous and next eojeols,
+    because tags at the boundary of an eojeol (e.g. EF or EC) depend on the morphemes next to it.
+    Its value is `Pos` flags of each character, analyzed with the neighbor eojeols when it is missed.
+    The least recently used entries are evicted when the total size exceeds `max_bytes`.
+
+    Args:
+        max_bytes (int): maximum total size of the cached eojeols and flags
+    """
+
+    def __init__(self, max_bytes: int = 16 * 2**20):
+        super().__init__(max_bytes=max_bytes)
+
+    @staticmethod
+    def key(backend: str, eojeol: str, before: str, after: str) -> tuple:
+        """
+        Get the key of an eojeol.
+
+        Args:
+            backend (str): morpheme analyzer backend
+            eojeol (str): characters between spaces
+            before (str): previous eojeol ('' at the beginning of text)
+            after (str): next eojeol ('' at the end of text)
+
+        Returns:
+            tuple: key of the eojeol
+        """
+        return backend, eojeol, before, after
+
+    def get(self, key):
+        return self._lookup(key)
+
+    def put(self, key, tags):
+        size = sum(sys.getsizeof(item) for item in key) + sys.getsizeof(tags)
+        self._store(key, tags, size)
+
+
+class SqliteCache(Cache):
+    """
+    On-disk cache in a sqlite database, shared by worker processes and kept across runs.
+    The least recently used entries are evicted when the total size exceeds `max_bytes`.
+    The last used time of a found entry is written only if it is older than `TOUCH_INTERVAL` seconds,
+    so that reading workers don't wait for the write lock of each other.
+
+    Args:
+        path (str): path of the database file (on a local disk)
+        max_bytes (int): maximum total size of the cached sentences
+    """
+
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 2**20):
+        super().__init__()
+        assert isinstance(max_bytes, int), "param `max_bytes` must be `int` type"
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.connection = None
+        self.pid = None
+        self.size = None
+
+    def _connect(self):
+        # a connection can't be shared with forked processes
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(
+                self.path, timeout=60, isolation_level=None
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS sentences "
+                "(key BLOB PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS sentences_used ON sentences (used)"
+            )
+            self.pid = os.getpid()
+            self.size = None
+        return self.connection
+
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT value, used FROM sentences WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        now = time.time()
+        if now - row[1] > self.TOUCH_INTERVAL:
+            connection.execute(
+                "UPDATE sentences SET used = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key, sentences):
+        value = json.dumps(sentences, ensure_ascii=False).encode("utf-8")
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+
+        connection = self._connect()
+        replaced = connection.execute(
+            "SELECT size FROM sentences WHERE key = ?", (key,)
+        ).fetchone()
+        connection.execute(
+            "INSERT OR REPLACE INTO sentences VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time()),
+        )
+
+        # other processes write too, so the total is read again before evicting.
+        if self.size is None:
+            self.size = self.total_size()
+        else:
+            self.size += size - (replaced[0] if replaced is not None else 0)
+
+        if self.size > self.max_bytes:
+            self.size = self.total_size()
+            self._evict()
+
+    def _evict(self):
+        connection = self._connect()
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+
+        keys = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM sentences ORDER BY used"
+        ):
+            keys.append((key,))
+            excess -= size
+            self.size -= size
+            if excess <= 0:
+                break
+
+        connection.executemany("DELETE FROM sentences WHERE key = ?", keys)
+        self.evictions += len(keys)
+
+    def total_size(self) -> int:
+        """Get total size of the cached sentences in the database."""
+        row = self._connect().execute("SELECT SUM(size) FROM sentences").fetchone()
+        return row[0] or 0
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(connection=None, pid=None, size=None)
+        return state
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
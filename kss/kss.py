@@ -9,20 +9,21 @@
 #
 # This software may be modified and distributed under the terms
 # of the BSD license.  See the LICENSE file for details.
-import functools
 import gc
 import logging
 import math
-import re
+import os
+import time
 from concurrent.futures import ProcessPoolExecutor as Pool
 from functools import partial
-from typing import List, Union, Tuple
+from typing import IO, Iterable, Iterator, List, Optional, Union, Tuple
 
 import more_itertools
 
 from kss.base import (
     Const,
-    Eojeol,
+    Pos,
+    Tokens,
     Postprocessor,
     Preprocessor,
     check_pos,
@@ -32,14 +33,14 @@ from kss.base import (
     get_num_workers,
     clear_list_to_sentences,
     get_chunk_with_index,
-    preprocess_text,
+    get_sentence_offsets,
     _morph,
+    _table,
     build_preprocessed_list,
+    pos_with_cache,
 )
-from kss.morph import get_mecab
-from kss.rule import Table, Stats, ID
-
-NOTICE_MECAB = False
+from kss.cache import Cache, MemoryCache, MorphCache
+from kss.rule import ID, Stats, Symbol
 
 
 def split_sentences(
@@ -47,11 +48,14 @@ def split_sentences(
     use_heuristic: bool = True,
     use_quotes_brackets_processing: bool = False,
     max_recover_step: int = 5,
-    max_recover_length: int = 20000,
+    max_recover_length: Optional[int] = None,
     backend: str = "auto",
     num_workers: Union[str, int] = "auto",
     disable_gc: Union[str, bool] = "auto",
     disable_mp_post_process: bool = False,
+    chars_per_task: int = 65536,
+    cache: Optional[Cache] = None,
+    morph_cache: Optional[MorphCache] = None,
 ) -> Union[List[str], List[List[str]]]:
     """
     Split document to sentences.
@@ -61,163 +65,707 @@ def split_sentences(
         use_heuristic (bool): use heuristic algorithms or not
         use_quotes_brackets_processing (bool): use quotes or bracket processing or not
         max_recover_step (int): maximum step for quote and bracket misalignment recovering
-        max_recover_length (int): maximum text length to recover when quote and bracket misaligned
+        max_recover_length (Optional[int]): maximum line length to recover when quote and bracket misaligned (default: no limit)
         backend (str): max length of text to use morpheme feature
         num_workers (Union[str, int]): number of multiprocessing workers ('-1' means maximum processes)
         disable_gc (Union[str, bool]): disable garbage collecting (It helps to improve speed)
-        disable_mp_post_process (bool): disable multiprocessing postprocessing
+        disable_mp_post_process (bool): deprecated, sentences are always regrouped by document in linear time
+        chars_per_task (int): number of characters sent to a worker at once
+        cache (Optional[Cache]): cache of segmented sentences (default: cache shared in the process)
+        morph_cache (Optional[MorphCache]): cache of morpheme analysis per eojeol (default: not used)
 
     Returns:
         Union[List[str], List[List[str]]]: list of segmented sentences
     """
-    assert isinstance(backend, str), "param `backend` must be `str` type"
-    backend = backend.lower()
+    with Splitter(
+        use_heuristic=use_heuristic,
+        use_quotes_brackets_processing=use_quotes_brackets_processing,
+        max_recover_step=max_recover_step,
+        max_recover_length=max_recover_length,
+        backend=backend,
+        num_workers=num_workers,
+        disable_gc=disable_gc,
+        disable_mp_post_process=disable_mp_post_process,
+        chars_per_task=chars_per_task,
+        cache=cache,
+        morph_cache=morph_cache,
+    ) as splitter:
+        assert (
+            isinstance(text, str) or isinstance(text, list) or isinstance(text, tuple)
+        ), "param `text` must be one of [str, List[str], Tuple[str]]."
 
-    assert backend in [
-        "pynori",
-        "mecab",
-        "none",
-        "auto",
-    ], "Wrong backend! Currently, we support [`pynori`, `mecab`, `none`, `auto`] backend."
+        if isinstance(text, str):
+            return splitter.split(text)
+        else:
+            return splitter.split_batch(text)
 
-    if backend == "auto":
-        try:
-            _ = get_mecab()
-            backend = "mecab"
-        except:
-            import platform
 
-            global NOTICE_MECAB
-            if platform.uname().system in ["Darwin", "Linux"] and NOTICE_MECAB is False:
-                logging.warning(
-                    "You can install `python-mecab-kor` for faster kss execution.\n"
-                    "Try to install it using `pip install python-mecab-kor`.\n"
-                    "Refer https://github.com/hyuwoongko/python-mecab-kor for more details.\n"
-                )
-                NOTICE_MECAB = True
+def split_sentences_with_offsets(
+    text: Union[str, tuple, List[str]],
+    **kwargs,
+) -> Union[List[Tuple[int, int]], List[List[Tuple[int, int]]]]:
+    """
+    Split document to sentences and return character offsets of them.
+    Each span indexes the original input, so `text[start:end]` is the source of each sentence.
+
+    Args:
+        text (Union[str, tuple, List[str]]): input text
+        **kwargs: parameters of `split_sentences`
 
-            backend = "pynori"
+    Returns:
+        Union[List[Tuple[int, int]], List[List[Tuple[int, int]]]]: list of (start, end) spans of segmented sentences
+    """
+    assert (
+        isinstance(text, str) or isinstance(text, list) or isinstance(text, tuple)
+    ), "param `text` must be one of [str, List[str], Tuple[str]]."
 
-    if num_workers == "auto":
+    with Splitter(**kwargs) as splitter:
         if isinstance(text, str):
-            num_workers = 1
+            return splitter.split_with_offsets(text)
         else:
-            num_workers = -1
+            # documents are split at once, so that they can be sent to the workers together.
+            return [
+                get_sentence_offsets(t, sentences)
+                for t, sentences in zip(text, splitter.split_batch(text))
+            ]
 
-    if isinstance(text, str) and "\n" not in text:
-        num_workers = 1
 
-    if backend == "pynori":
-        _morph.create_pynori()
+def iter_sentences(
+    source: Union[os.PathLike, IO, Iterable[str]],
+    per_document: bool = False,
+    batch_size: int = 256,
+    **kwargs,
+) -> Iterator[Union[str, List[str]]]:
+    """
+    Split sentences from a file or an iterable of documents lazily.
+    Documents are read and split batch by batch, so memory usage doesn't grow with the input size.
+    If a file is given, each line is a document. A `str` is text in every other function,
+    so it is rejected here instead of being opened. (use `pathlib.Path` for a file path)
 
-    assert (
-        isinstance(text, str) or isinstance(text, list) or isinstance(text, tuple)
-    ), "param `text` must be one of [str, List[str], Tuple[str]]."
+    Args:
+        source (Union[os.PathLike, IO, Iterable[str]]): file path (`pathlib.Path`), file object or iterable of documents
+        per_document (bool): yield list of sentences of each document instead of each sentence
+        batch_size (int): number of documents sent to workers at once
+        **kwargs: parameters of `split_sentences`
+
+    Yields:
+        Union[str, List[str]]: segmented sentence or list of segmented sentences of each document
+    """
+    with Splitter(**kwargs) as splitter:
+        yield from splitter.iter_split(source, per_document, batch_size)
+
+
+class SchedulerStats(object):
+    """
+    Statistics of the tasks which a `Splitter` sent to its worker pool.
+
+    Attributes:
+        tasks (int): number of tasks
+        segments (int): number of segments (lines or pieces of a long line)
+        chars (int): number of characters
+        bytes (int): number of utf-8 bytes
+        busy_time (Dict[int, float]): seconds spent on the tasks by each worker process id
+    """
+
+    def __init__(self):
+        self.tasks = 0
+        self.segments = 0
+        self.chars = 0
+        self.bytes = 0
+        self.busy_time = {}
+
+    def add(self, worker, busy_time, segments, chars, bytes):
+        self.tasks += 1
+        self.segments += segments
+        self.chars += chars
+        self.bytes += bytes
+        self.busy_time[worker] = self.busy_time.get(worker, 0.0) + busy_time
+
+    def __repr__(self):
+        return (
+            f"SchedulerStats(tasks={self.tasks}, segments={self.segments}, "
+            f"chars={self.chars}, bytes={self.bytes}, busy_time={self.busy_time})"
+        )
+
+
+class Splitter(object):
+    """
+    Sentence splitter which keeps its configuration, resolved backend and worker pool.
+
+    Use this instead of `split_sentences` when you split texts many times in a long-running process.
+    Worker processes are created once, initialized with the morpheme analyzer preloaded and reused by every call.
 
-    assert isinstance(use_heuristic, bool), "param `use_heuristic` must be `bool` type"
-    assert isinstance(
-        use_quotes_brackets_processing, bool
-    ), "param `use_quotes_brackets_processing` must be `bool` type"
-    assert isinstance(
-        max_recover_step, int
-    ), "param `max_recover_step` must be `int` type"
-    assert isinstance(
-        max_recover_length, int
-    ), "param `max_recover_length` must be `int` type"
-    assert isinstance(num_workers, int), "param `num_workers` must be `int` type"
-
-    if disable_gc == "auto":
-        if backend == "pynori":
+    Args:
+        use_heuristic (bool): use heuristic algorithms or not
+        use_quotes_brackets_processing (bool): use quotes or bracket processing or not
+        max_recover_step (int): maximum step for quote and bracket misalignment recovering
+        max_recover_length (Optional[int]): maximum line length to recover when quote and bracket misaligned (default: no limit)
+        backend (str): morpheme analyzer backend
+        num_workers (Union[str, int]): number of multiprocessing workers ('-1' means maximum processes)
+        disable_gc (Union[str, bool]): disable garbage collecting (It helps to improve speed)
+        disable_mp_post_process (bool): deprecated, sentences are always regrouped by document in linear time
+        chars_per_task (int): number of characters sent to a worker at once
+        cache (Optional[Cache]): cache of segmented sentences (default: cache shared in the process)
+        morph_cache (Optional[MorphCache]): cache of morpheme analysis per eojeol (default: not used)
+
+    Attributes:
+        stats (SchedulerStats): statistics of the tasks sent to the workers
+        cache (Cache): cache of segmented sentences, with hit/miss/eviction counters of the workers
+        morph_cache (Optional[MorphCache]): cache of morpheme analysis per eojeol, with counters of the workers
+
+    Examples:
+        >>> with Splitter(backend="mecab", num_workers=4) as splitter:
+        ...     splitter.split("안녕하세요. 반가워요.")
+        ...     splitter.split_batch(["안녕하세요. 반가워요.", "좋아요. 싫어요."])
+    """
+
+    # a segment longer than this is cut into pieces which are split in parallel
+    MAX_PIECE_LENGTH = 20000
+    # `num_workers="auto"` uses multiprocessing for a single text longer than this
+    MIN_PARALLEL_LENGTH = 200000
+
+    def __init__(
+        self,
+        use_heuristic: bool = True,
+        use_quotes_brackets_processing: bool = False,
+        max_recover_step: int = 5,
+        max_recover_length: Optional[int] = None,
+        backend: str = "auto",
+        num_workers: Union[str, int] = "auto",
+        disable_gc: Union[str, bool] = "auto",
+        disable_mp_post_process: bool = False,
+            chars_per_task: int = 65536,
+        cache: Optional[Cache] = None,
+        morph_cache: Optional[MorphCache] = None,
+    ):
+        assert isinstance(backend, str), "param `backend` must be `str` type"
+        backend = backend.lower()
+
+        assert backend in [
+            "pynori",
+            "mecab",
+            "none",
+            "auto",
+        ], "Wrong backend! Currently, we support [`pynori`, `mecab`, `none`, `auto`] backend."
+
+        assert isinstance(use_heuristic, bool), "param `use_heuristic` must be `bool` type"
+        assert isinstance(
+            use_quotes_brackets_processing, bool
+        ), "param `use_quotes_brackets_processing` must be `bool` type"
+        assert isinstance(
+            max_recover_step, int
+        ), "param `max_recover_step` must be `int` type"
+        assert max_recover_length is None or isinstance(
+            max_recover_length, int
+        ), "param `max_recover_length` must be `int` type"
+        assert (
+            isinstance(chars_per_task, int) and chars_per_task > 0
+        ), "param `chars_per_task` must be positive `int` type"
+        assert cache is None or isinstance(
+            cache, Cache
+        ), "param `cache` must be `Cache` type"
+        assert morph_cache is None or isinstance(
+            morph_cache, MorphCache
+        ), "param `morph_cache` must be `MorphCache` type"
+        assert num_workers == "auto" or isinstance(
+            num_workers, int
+        ), "param `num_workers` must be `int` type"
+
+        self.use_heuristic = use_heuristic
+        self.use_quotes_brackets_processing = use_quotes_brackets_processing
+        self.max_recover_step = max_recover_step
+        self.max_recover_length = max_recover_length
+        self.backend = _morph.resolve_backend(backend)
+        self.num_workers = num_workers
+        self.disable_gc = disable_gc
+        self.disable_mp_post_process = disable_mp_post_process
+        self.chars_per_task = chars_per_task
+        self.stats = SchedulerStats()
+        self.cache = _default_cache if cache is None else cache
+        self.morph_cache = morph_cache
+
+        if self.backend == "pynori":
+            _morph.create_pynori()
+
+        self.pool = None
+        self.pool_workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.pool_workers = None
+
+    def get_pool(self, num_workers):
+        if self.pool is not None and self.pool_workers != num_workers:
+            self.close()
+
+        if self.pool is None:
+            self.pool = Pool(
+                max_workers=num_workers,
+                initializer=_init_worker,
+                initargs=(self.backend, self.cache, self.morph_cache),
+            )
+            self.pool_workers = num_workers
+
+        return self.pool
+
+    def _disable_gc(self):
+        if self.disable_gc == "auto":
+            if self.backend == "pynori":
+                gc.disable()
+        elif self.disable_gc is True:
             gc.disable()
-    elif disable_gc is True:
-        gc.disable()
 
-    num_workers = get_num_workers(num_workers)
-    results = []
+    def _enable_gc(self):
+        if self.disable_gc == "auto":
+            if self.backend == "pynori":
+                gc.enable()
+        elif self.disable_gc is True:
+            gc.enable()
 
-    max_recover_step = length_constraints(
-        text,
-        max_recover_length,
-        max_recover_step,
-    )
+    def split(self, text: str) -> List[str]:
+        """
+        Split a document to sentences.
+
+        Args:
+            text (str): input text
+
+        Returns:
+            List[str]: list of segmented sentences
+        """
+        assert isinstance(text, str), "param `text` must be `str` type."
+        return self._split(text)
+
+    def split_with_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Split a document to sentences and return their spans in the document.
+
+        Args:
+            text (str): input text
+
+        Returns:
+            List[Tuple[int, int]]: list of (start, end) spans of segmented sentences
+        """
+        assert isinstance(text, str), "param `text` must be `str` type."
+        return get_sentence_offsets(text, self._split(text))
+
+    def split_batch(self, texts: Union[tuple, List[str]]) -> List[List[str]]:
+        """
+        Split documents to sentences.
+
+        Args:
+            texts (Union[tuple, List[str]]): input texts
+
+        Returns:
+            List[List[str]]: list of segmented sentences of each document
+        """
+        assert isinstance(texts, list) or isinstance(
+            texts, tuple
+        ), "param `texts` must be one of [List[str], Tuple[str]]."
+        return self._split(texts)
+
+    def iter_split(
+        self,
+        source: Union[os.PathLike, IO, Iterable[str]],
+        per_document: bool = False,
+        batch_size: int = 256,
+    ) -> Iterator[Union[str, List[str]]]:
+        """
+        Split documents from a file or an iterable lazily.
+
+        Args:
+            source (Union[os.PathLike, IO, Iterable[str]]): file path (`pathlib.Path`), file object or iterable of documents
+            per_document (bool): yield list of sentences of each document instead of each sentence
+            batch_size (int): number of documents sent to workers at once
+
+        Yields:
+            Union[str, List[str]]: segmented sentence or list of segmented sentences of each document
+        """
+        assert isinstance(per_document, bool), "param `per_document` must be `bool` type"
+        assert (
+            isinstance(batch_size, int) and batch_size > 0
+        ), "param `batch_size` must be positive `int` type"
+        assert not isinstance(source, str), (
+            "param `source` must not be `str` type. "
+            "use `pathlib.Path` for a file path, or `split_sentences` for a text."
+        )
 
-    if isinstance(text, str):
-        _text = [text]
-    else:
-        _text = text
+        if isinstance(source, os.PathLike):
+            with open(source, "r", encoding="utf-8") as f:
+                yield from self.iter_split(f, per_document, batch_size)
+            return
 
-    if num_workers in [0, 1]:
-        pool = None
-    else:
-        pool = Pool(max_workers=num_workers)
+        num_workers = self.num_workers
+        if num_workers == "auto":
+            num_workers = -1
 
-    if pool:
-        preprocessed_list = list(pool.map(build_preprocessed_list, _text))
-    else:
-        preprocessed_list = [build_preprocessed_list(t) for t in _text]
+        num_workers = get_num_workers(num_workers)
+        pool = None if num_workers in [0, 1] else self.get_pool(num_workers)
 
-    for input_text in preprocessed_list:
-        if len(input_text) == 0:
-            input_text.append("")
+        if pool is None:
+            batch_size = 1
 
-    mp_temp = preprocessed_list
-    mp_input_texts = list(more_itertools.flatten(preprocessed_list))
-    pattern = re.compile("[ ]+")
+        for documents in more_itertools.chunked(source, batch_size):
+            for document in documents:
+                assert isinstance(document, str), "every document must be `str` type."
 
-    if not disable_mp_post_process:
-        mp_postprocessing = list(map(lambda x: pattern.sub("", "".join(x)), mp_temp))
+            self._disable_gc()
 
-    if pool and len(mp_input_texts) >= 2:
-        results += pool.map(
-            partial(
-                _split_sentences,
-                use_heuristic=use_heuristic,
-                use_quotes_brackets_processing=use_quotes_brackets_processing,
-                max_recover_step=max_recover_step,
-                max_recover_length=max_recover_length,
-                backend=backend,
-            ),
-            mp_input_texts,
+            try:
+                results = self._split_documents(documents, pool)
+            finally:
+                self._enable_gc()
+
+            for sentences in results:
+                if per_document:
+                    yield sentences
+                else:
+                    yield from sentences
+
+    def _split_documents(self, documents, pool):
+        if pool:
+            chunksize = max(len(documents) // (self._num_pool_workers() * 4), 1)
+            preprocessed_list = list(
+                pool.map(build_preprocessed_list, documents, chunksize=chunksize)
+            )
+        else:
+            preprocessed_list = [build_preprocessed_list(d) for d in documents]
+
+        # every segment is tagged with the index of its document,
+        # so sentences are regrouped in one pass whatever the documents contain.
+        document_ids = [
+            document_id
+            for document_id, segments in enumerate(preprocessed_list)
+            for _ in segments
+        ]
+        input_texts = list(more_itertools.flatten(preprocessed_list))
+        results = self._split_segments(input_texts, pool)
+
+        outputs = [[] for _ in preprocessed_list]
+        for document_id, sentences in zip(
+            document_ids, clear_list_to_sentences(results)
+        ):
+            outputs[document_id] += sentences
+        return outputs
+
+    def _num_pool_workers(self):
+        return self.pool_workers or os.cpu_count() or 1
+
+    def _split_segments(self, input_texts, pool):
+        # recovering cost is linear in the length of each segment,
+        # so quotes calibration is turned off only if `max_recover_length` is given.
+        max_recover_steps = [
+            length_constraints(t, self.max_recover_length, self.max_recover_step)
+            for t in input_texts
+        ]
+        if self.use_quotes_brackets_processing and self.max_recover_step > 0:
+            num_long = max_recover_steps.count(0)
+            if num_long > 0:
+                logging.warning(
+                    f"Too long text! turn off quotes calibration for {num_long} line(s) "
+                    f"longer than {self.max_recover_length} characters!"
+                )
+
+        kwargs = dict(
+            use_heuristic=self.use_heuristic,
+            use_quotes_brackets_processing=self.use_quotes_brackets_processing,
+            backend=self.backend,
         )
-    else:
-        results += [
-            _split_sentences(
-                text=t,
-                use_heuristic=use_heuristic,
-                use_quotes_brackets_processing=use_quotes_brackets_processing,
-                max_recover_step=max_recover_step,
-                max_recover_length=max_recover_length,
-                backend=backend,
+        split_segment = partial(
+            _split_segment, cache=self.cache, morph_cache=self.morph_cache, **kwargs
+        )
+
+        if pool is None:
+            return list(map(split_segment, input_texts, max_recover_steps))
+
+        # huge segments are cut into pieces, so that one document can use every worker.
+        # (quotes and brackets are balanced over a whole segment, so it can't be cut)
+        max_piece_length = self.MAX_PIECE_LENGTH
+        if self.use_quotes_brackets_processing:
+            max_piece_length = math.inf
+
+        pieces, piece_steps, piece_spans = [], [], []
+        for text, max_recover_step in zip(input_texts, max_recover_steps):
+            spans = _cut_segment(text, max_piece_length)
+            pieces += [text[start:end] for start, end in spans]
+            piece_steps += [max_recover_step] * len(spans)
+            piece_spans.append(spans)
+
+        if len(pieces) < 2:
+            return list(map(split_segment, input_texts, max_recover_steps))
+
+        # long pieces are sent first, and short ones are packed into tasks of similar size.
+        lengths = [len(piece) for piece in pieces]
+        budget = min(
+            self.chars_per_task, sum(lengths) // (self._num_pool_workers() * 4)
+        )
+        batches = _schedule_batches(lengths, max(budget, 1))
+        outputs = pool.map(
+            partial(_split_segment_batch, **kwargs),
+            [[pieces[i] for i in batch] for batch in batches],
+            [[piece_steps[i] for i in batch] for batch in batches],
+        )
+
+        piece_results = [None] * len(pieces)
+        for batch, (worker, busy_time, counters, morph_counters, batch_results) in zip(
+            batches, outputs
+        ):
+            self.cache.add_counters(*counters)
+            if self.morph_cache is not None:
+                self.morph_cache.add_counters(*morph_counters)
+            self.stats.add(
+                worker,
+                busy_time,
+                segments=len(batch),
+                chars=sum(lengths[i] for i in batch),
+                bytes=sum(len(pieces[i].encode("utf-8")) for i in batch),
             )
-            for t in mp_input_texts
+            for i, result in zip(batch, batch_results):
+                piece_results[i] = result
+        piece_results = iter(piece_results)
+
+        results = []
+        for text, max_recover_step, spans in zip(
+            input_texts, max_recover_steps, piece_spans
+        ):
+            result = list(more_itertools.take(len(spans), piece_results))
+            split = partial(split_segment, max_recover_step=max_recover_step)
+            if len(spans) == 1:
+                results.append(result[0])
+            else:
+                results.append(_stitch_pieces(text, spans, result, split))
+
+        return results
+
+    def _split(self, text):
+        num_workers = self.num_workers
+
+        if num_workers == "auto":
+            if isinstance(text, str) and len(text) <= self.MIN_PARALLEL_LENGTH:
+                num_workers = 1
+            else:
+                num_workers = -1
+
+        if (
+            isinstance(text, str)
+            and "\n" not in text
+            and len(text) <= self.MAX_PIECE_LENGTH
+        ):
+            num_workers = 1
+
+        num_workers = get_num_workers(num_workers)
+
+        if num_workers in [0, 1]:
+            pool = None
+        else:
+            pool = self.get_pool(num_workers)
+
+        self._disable_gc()
+
+        try:
+            if isinstance(text, str):
+                return self._split_documents([text], pool)[0]
+            else:
+                return self._split_documents(text, pool)
+        finally:
+            self._enable_gc()
+
+
+def _split_segment(text, max_recover_step, cache, morph_cache, **kwargs):
+    return _split_sentences_cached(
+        cache,
+        text,
+        max_recover_step=max_recover_step,
+        morph_cache=morph_cache,
+        **kwargs,
+    )
+
+
+def _split_segment_batch(texts, max_recover_steps, **kwargs):
+    # one task of the pool, to send many small segments at once
+    start = time.perf_counter()
+    counters = _worker_cache.counters()
+    morph_counters = _counters(_worker_morph_cache)
+    results = [
+        _split_sentences_cached(
+            _worker_cache,
+            text,
+            max_recover_step=max_recover_step,
+            morph_cache=_worker_morph_cache,
+            **kwargs,
+        )
+        for text, max_recover_step in zip(texts, max_recover_steps)
+    ]
+    counters = tuple(
+        after - before for before, after in zip(counters, _worker_cache.counters())
+    )
+    morph_counters = tuple(
+        after - before
+        for before, after in zip(morph_counters, _counters(_worker_morph_cache))
+    )
+    return os.getpid(), time.perf_counter() - start, counters, morph_counters, results
+
+
+def _counters(cache):
+    return (0, 0, 0) if cache is None else cache.counters()
+
+
+def _schedule_batches(lengths, budget):
+    """
+    Group items into batches of about `budget` total length, longest items first.
+    An item longer than `budget` makes a batch alone.
+
+    Args:
+        lengths (List[int]): length of each item
+        budget (int): total length of a batch
+
+    Returns:
+        List[List[int]]: indices of the items in each batch
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+    batches, batch, size = [], [], 0
+    for i in order:
+        if len(batch) != 0 and size + lengths[i] > budget:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(i)
+        size += lengths[i]
+
+    if len(batch) != 0:
+        batches.append(batch)
+    return batches
+
+
+def _cut_segment(text, max_length):
+    """
+    Cut a huge segment into pieces not longer than `max_length`.
+
+    A piece ends at a space after a sentence ending mark if possible, and at any space otherwise.
+    The space at a cut belongs to neither piece.
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) span of each piece
+    """
+    spans, start = [], 0
+    while len(text) - start > max_length:
+        end = start + max_length
+        for mark in [". ", "? ", "! ", " "]:
+            cut = text.rfind(mark, start + max_length // 2, end)
+            if cut != -1:
+                cut += len(mark) - 1
+                spans.append((start, cut))
+                start = cut + 1
+                break
+        else:
+            spans.append((start, end))
+            start = end
+
+    spans.append((start, len(text)))
+    return spans
+
+
+def _stitch_pieces(text, spans, piece_results, split):
+    """
+    Join sentences of the pieces cut from one segment.
+
+    The sentences around each cut are split again together.
+    If the outermost of them don't match the pieces, a cut changed the result beyond them,
+    so the window is doubled until they match, and the result is the same as splitting the whole segment.
+    If the window has to go beyond the previous piece (e.g. a sentence longer than a piece),
+    the whole segment is split at once instead.
+
+    Args:
+        text (str): segment
+        spans (List[Tuple[int, int]]): span of each piece
+        piece_results (List[List[str]]): sentences of each piece
+        split (Callable[[str], List[str]]): function splitting a text to sentences
+
+    Returns:
+        List[str]: sentences of the segment
+    """
+
+    def _clear(sentences):
+        return clear_list_to_sentences([sentences])[0]
+
+    def _offsets(start, end, sentences):
+        return [
+            (start + s, start + e)
+            for s, e in get_sentence_offsets(text[start:end], sentences)
         ]
 
-    mp_output_final = []
-    mp_temp.clear()
-    _results = clear_list_to_sentences(results)
+    sentences, offsets = [], []
+    for i, ((start, end), result) in enumerate(zip(spans, piece_results)):
+        result = _clear(result)
+        result_offsets = _offsets(start, end, result)
+
+        if len(sentences) == 0:
+            sentences, offsets = result, result_offsets
+            continue
+
+        num = 1
+        while True:
+            left = max(len(sentences) - num, 0)
+            right = min(num, len(result))
+            window_start = offsets[left][0]
+            if window_start < spans[i - 1][0]:
+                return split(text)
+
+            window_end = result_offsets[right - 1][1] if right > 0 else end
+            joined = _clear(split(text[window_start:window_end]))
+
+            if len(joined) != 0 and (
+                (left == 0 or joined[0] == sentences[left])
+                and (right == len(result) or joined[-1] == result[right - 1])
+            ):
+                break
+            num *= 2
+
+        sentences = sentences[:left] + joined + result[right:]
+        offsets = (
+            offsets[:left]
+            + _offsets(window_start, window_end, joined)
+            + result_offsets[right:]
+        )
 
-    if pool and not disable_mp_post_process:
-        for result in _results:
-            mp_temp += result
-            out = pattern.sub("", "".join(mp_temp))
+    return sentences
 
-            if out in mp_postprocessing:
-                mp_output_final.append(mp_temp)
-                mp_temp = []
-        results = mp_output_final
-    else:
-        results = _results
 
-    if disable_gc == "auto":
-        if backend == "pynori":
-            gc.enable()
-    elif disable_gc is True:
-        gc.enable()
+# cache used when `Splitter` is created without one
+_default_cache = MemoryCache()
+# caches of the `Splitter` which created this worker process
+_worker_cache = _default_cache
+_worker_morph_cache = None
 
-    if isinstance(text, str):
-        return results[0]
-    else:
-        return results
+
+def _init_worker(backend, cache, morph_cache):
+    # load morpheme analyzer once per worker process
+    global _worker_cache, _worker_morph_cache
+    _worker_cache = cache
+    _worker_morph_cache = morph_cache
+
+    if backend == "pynori":
+        _morph.create_pynori()
+    elif backend == "mecab":
+        _morph.create_mecab()
+
+
+def available_backends() -> List[str]:
+    """
+    Get available backends.
+    Backend availability is checked only once per process.
+
+    Returns:
+        List[str]: list of available backends
+    """
+    return _morph.available_backends()
 
 
 def split_chunks(
@@ -251,14 +799,18 @@ def split_chunks(
         _text = text
         _type = list
 
+    if _type == str:
+        offsets = [split_sentences_with_offsets(text, **kwargs)]
+    else:
+        offsets = split_sentences_with_offsets(list(_text), **kwargs)
     chunks = [
         _split_chunks(
             _txt,
+            _offsets,
             max_length,
             overlap,
-            **kwargs,
         )
-        for _txt in _text
+        for _txt, _offsets in zip(_text, offsets)
     ]
 
     if _type == str:
@@ -267,109 +819,232 @@ def split_chunks(
         return chunks
 
 
-@functools.lru_cache(maxsize=500)
+def _split_sentences_cached(cache, text, morph_cache=None, **kwargs):
+    # every option changes the result, so all of them are a part of the key.
+    # (analysis with `morph_cache` may differ from analysis of the whole text)
+    options = sorted(kwargs.items())
+    if morph_cache is not None:
+        options.append(("morph_cache", True))
+
+    key = cache.digest(text, *options)
+    sentences = cache.get(key)
+    if sentences is None:
+        sentences = _split_sentences(text, morph_cache=morph_cache, **kwargs)
+        cache.put(key, sentences)
+    return sentences
+
+
 def _split_sentences(
     text: str,
     use_heuristic: bool,
     use_quotes_brackets_processing: bool,
     max_recover_step: int,
-    max_recover_length: int,
     backend: str,
-    recover_step: int = 0,
+    morph_cache: Optional[MorphCache] = None,
 ):
     if use_quotes_brackets_processing:
         text = text.replace("\u200b", "")
 
     use_morpheme = backend != "none"
     prep = Preprocessor(use_morpheme=use_morpheme)
+
+    # if you use morpheme feature, ec cases are unnecessary.
+    # pynori can't process emoji, so they are masked too.
+    text = prep.backup(
+        text,
+        ec_cases=not use_morpheme,
+        emojis=backend == "pynori",
+        quotes=use_quotes_brackets_processing,
+    )
+
+    if use_morpheme:
+        if morph_cache is not None:
+            tokens = pos_with_cache(text=text, backend=backend, cache=morph_cache)
+        else:
+            tokens = _morph.pos(text=text, backend=backend)
+    else:
+        tokens = Tokens.from_text(text, "EF+ETN")
+
+    results = _recover_sentences(
+        text,
+        tokens,
+        use_heuristic=use_heuristic,
+        use_quotes_brackets_processing=use_quotes_brackets_processing,
+        use_morpheme=use_morpheme,
+        max_recover_step=max_recover_step,
+    )
+
+    outputs = []
+    for s in results:
+        s = prep.restore(s)
+        if use_quotes_brackets_processing:
+            s = s.replace("\u200b", "")
+        outputs.append(s)
+
+    return outputs
+
+
+def _recover_sentences(
+    text,
+    tokens,
+    use_heuristic,
+    use_quotes_brackets_processing,
+    use_morpheme,
+    max_recover_step,
+):
+    """
+    Split eojeols to sentences and recover misaligned quotes and brackets.
+
+    If a quote or bracket is left unbalanced, the eojeols are split again before and after it,
+    and the two sides are joined back by the quote. This is repeated up to `max_recover_step` times
+    with an explicit stack over slices of the same eojeols, so morpheme analysis is never repeated
+    and every recovery step takes linear time.
+    """
     post = Postprocessor()
+    tasks, values = [(0, len(tokens), 0)], []
 
-    if not use_morpheme:
-        # but if you use morpheme feature, it is unnecessary.
-        text = prep.add_ec_cases_to_dict(text)
+    while len(tasks) > 0:
+        task = tasks.pop()
 
-    if backend == "pynori":
-        # pynori can't process emoji
-        text = prep.add_emojis_to_dict(text)
+        if isinstance(task, str):
+            after_quote, before_quote = values.pop(), values.pop()
+            values.append(_realign_by_quotes(before_quote, after_quote, task))
+            continue
 
-    text = prep.backup(text)
+        start, end, recover_step = task
+        _tokens = tokens[start:end]
+        if use_quotes_brackets_processing:
+            results, misaligned = _split_eojeols(
+                _tokens,
+                use_heuristic=use_heuristic,
+                use_quotes_brackets_processing=use_quotes_brackets_processing,
+                use_morpheme=use_morpheme,
+            )
+        elif use_morpheme:
+            results = _split_eojeols_unquoted(
+                _tokens,
+                use_heuristic=use_heuristic,
+                use_morpheme=use_morpheme,
+            )
+            misaligned = None
+        else:
+            results = _split_eojeols_by_candidates(
+                _tokens.text,
+                use_heuristic=use_heuristic,
+            )
+            misaligned = None
 
-    if use_quotes_brackets_processing:
-        for s in Const.quotes_or_brackets:
-            text = text.replace(s, f"\u200b{s}\u200b")
+        if recover_step < max_recover_step and misaligned is not None:
+            quote_pos, quote_type = misaligned
+            quote_pos += start
+            before_end, after_start = quote_pos, quote_pos + 1
 
-    if use_morpheme:
-        eojeols = _morph.pos(text=text, backend=backend)
-    else:
-        eojeols = [Eojeol(t, "EF+ETN") for t in text]
+            # zero width spaces were inserted around the quote
+            if before_end > start and tokens.text[before_end - 1] == "\u200b":
+                before_end -= 1
+            if after_start < end and tokens.text[after_start] == "\u200b":
+                after_start += 1
+
+            tasks.append(quote_type)
+            tasks.append((after_start, end, recover_step + 1))
+            tasks.append((start, before_end, recover_step + 1))
+            continue
+
+        results = Preprocessor.tostring(results)
+
+        if use_heuristic is True:
+            if start != 0 or end != len(tokens):
+                _text = _tokens.text
+            else:
+                _text = text
+            results = post.apply_heuristic(_text, results, use_morpheme)
+
+        values.append(results)
 
+    return values[0]
+
+
+def _split_eojeols(
+    tokens,
+    use_heuristic,
+    use_quotes_brackets_processing,
+    use_morpheme,
+):
     double_stack, single_stack, bracket_stack = [], [], []
     empty_stacks = lambda: empty([single_stack, double_stack, bracket_stack], dim=2)
     DA = Stats.DA_MORPH if use_morpheme else Stats.DA_EOJEOL
 
+    text, tags = tokens.text, tokens.tags
+    classes = _table.classify(text)
+    symbols = _table.symbols
+    transitions = _table.transitions
+
     results = []
     cur_sentence = []
-    prev = Eojeol()
-    prev_non_space = Eojeol()
+    prev = ""
+    prev_cls = prev_non_space_cls = _table.classes[prev]
     cur_stat = Stats.DEFAULT
 
     last_single_pos, single_quote_pop = 0, "'"
     last_double_pos, double_quote_pop = 0, '"'
     last_bracket_pos, bracket_pop = 0, " "
 
-    for i, eojeol in enumerate(eojeols):
+    for i, eojeol in enumerate(text):
+        cls = classes[i]
+        symbol = symbols[cls]
+
         if cur_stat == Stats.DEFAULT:
-            if eojeol.eojeol in Const.double_quotes:
+            if symbol & Symbol.DOUBLE_QUOTE:
                 if use_quotes_brackets_processing:
-                    if eojeol.eojeol in Const.double_quotes_open_to_close.keys():
+                    if eojeol in Const.double_quotes_open_to_close.keys():
                         double_quote_pop = do_push_pop_symbol(
                             double_stack,
-                            Const.double_quotes_open_to_close[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.double_quotes_open_to_close[eojeol],
+                            eojeol,
                         )
                     else:
                         double_quote_pop = do_push_pop_symbol(
                             double_stack,
-                            Const.double_quotes_close_to_open[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.double_quotes_close_to_open[eojeol],
+                            eojeol,
                         )
                     last_double_pos = i
 
-            elif eojeol.eojeol in Const.single_quotes:
+            elif symbol & Symbol.SINGLE_QUOTE:
                 if use_quotes_brackets_processing:
-                    if eojeol.eojeol in Const.single_quotes_open_to_close.keys():
+                    if eojeol in Const.single_quotes_open_to_close.keys():
                         single_quote_pop = do_push_pop_symbol(
                             single_stack,
-                            Const.single_quotes_open_to_close[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.single_quotes_open_to_close[eojeol],
+                            eojeol,
                         )
                     else:
                         single_quote_pop = do_push_pop_symbol(
                             single_stack,
-                            Const.single_quotes_close_to_open[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.single_quotes_close_to_open[eojeol],
+                            eojeol,
                         )
                     last_single_pos = i
 
-            elif eojeol.eojeol in Const.brackets:
+            elif symbol & Symbol.BRACKET:
                 if use_quotes_brackets_processing:
-                    if eojeol.eojeol in Const.bracket_open_to_close.keys():
+                    if eojeol in Const.bracket_open_to_close.keys():
                         bracket_pop = do_push_pop_symbol(
                             bracket_stack,
-                            Const.bracket_open_to_close[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.bracket_open_to_close[eojeol],
+                            eojeol,
                         )
                     else:
                         bracket_pop = do_push_pop_symbol(
                             bracket_stack,
-                            Const.bracket_close_to_open[eojeol.eojeol],
-                            eojeol.eojeol,
+                            Const.bracket_close_to_open[eojeol],
+                            eojeol,
                         )
                     last_bracket_pos = i
 
-            elif eojeol.eojeol in [".", "!", "?", "…", "~"]:
+            elif symbol & Symbol.SB:
                 if (
-                    (Table[Stats.SB][prev.eojeol] & ID.PREV)
+                    (transitions[Stats.SB][prev_cls] & ID.PREV)
                     and empty_stacks()
                     # check if pos is SF(마침표, 물음표, 느낌표) or SE(줄임표)
                 ):
@@ -377,106 +1052,106 @@ def _split_sentences(
                         cur_stat = Stats.SB
                     else:
                         if i != 0:
-                            if check_pos(eojeols[i - 1], ["EF", "ETN"]):
+                            if check_pos(tags[i - 1], Pos.EF | Pos.ETN):
                                 cur_stat = Stats.SB
 
             if use_heuristic is True:
-                if eojeol.eojeol in ["다"]:
+                if symbol & Symbol.DA:
                     if (
-                        (Table[DA][prev.eojeol] & ID.PREV)
-                        and check_pos(eojeol, ["EF"])
+                        (transitions[DA][prev_cls] & ID.PREV)
+                        and check_pos(tags[i], Pos.EF)
                         and empty_stacks()
                         # check if pos is EF(종결어미)
                     ):
                         if not use_morpheme:
-                            if i != len(eojeols) - 1:
-                                if eojeols[i + 1].eojeol in Const.endpoint:
+                            if i != len(text) - 1:
+                                if symbols[classes[i + 1]] & Symbol.ENDPOINT:
                                     cur_stat = DA
                         else:
                             cur_stat = DA
 
-                elif eojeol.eojeol in ["요"]:
+                elif symbol & Symbol.YO:
                     if (
-                        (Table[Stats.YO][prev.eojeol] & ID.PREV)
-                        and check_pos(eojeol, ["EF"])
+                        (transitions[Stats.YO][prev_cls] & ID.PREV)
+                        and check_pos(tags[i], Pos.EF)
                         and empty_stacks()
                         # check if pos is EF(종결어미)
                     ):
                         if not use_morpheme:
-                            if i != len(eojeols) - 1:
-                                if eojeols[i + 1].eojeol in Const.endpoint:
+                            if i != len(text) - 1:
+                                if symbols[classes[i + 1]] & Symbol.ENDPOINT:
                                     cur_stat = Stats.YO
                         else:
                             cur_stat = Stats.YO
 
-                elif eojeol.eojeol in ["죠", "쥬", "죵"]:
+                elif symbol & Symbol.JYO:
                     if (
-                        (Table[Stats.JYO][prev.eojeol] & ID.PREV)
-                        and check_pos(eojeol, ["EF"])
+                        (transitions[Stats.JYO][prev_cls] & ID.PREV)
+                        and check_pos(tags[i], Pos.EF)
                         and empty_stacks()
                         # check if pos is EF(종결어미)
                     ):
                         if not use_morpheme:
-                            if i != len(eojeols) - 1:
-                                if eojeols[i + 1].eojeol in Const.endpoint:
+                            if i != len(text) - 1:
+                                if symbols[classes[i + 1]] & Symbol.ENDPOINT:
                                     cur_stat = Stats.JYO
                         else:
                             cur_stat = Stats.JYO
                 elif use_morpheme:
                     if (
                         empty_stacks()
-                        and i != len(eojeols) - 1
-                        and check_pos(eojeol, ["ETN", "EF"])
-                        and check_pos(eojeols[i + 1], ["SP", "SE", "SF", "SY"])
-                        and not check_pos(eojeols[i + 1], ["J", "XSN"])  # 조사나 명사파생 접미사가 아니여야 함.
-                        and not check_pos(eojeol, ["J", "XSN"])  # ETN+XSN 같은 케이스 막기위해
-                        and eojeol.eojeol
+                        and i != len(text) - 1
+                        and check_pos(tags[i], Pos.ETN | Pos.EF)
+                        and check_pos(tags[i + 1], Pos.SP | Pos.SE | Pos.SF | Pos.SY)
+                        and not check_pos(tags[i + 1], Pos.J | Pos.XSN)  # 조사나 명사파생 접미사가 아니여야 함.
+                        and not check_pos(tags[i], Pos.J | Pos.XSN)  # ETN+XSN 같은 케이스 막기위해
+                        and eojeol
                         not in ["다", "요", "죠", "기"]  # ~ 하기 (명사파생 접미사가 전성어미로 오해되는 경우)
                     ):
-                        next_eojeol_wo_sp = None
-                        for _e in eojeols[i + 1:]:
-                            if check_pos(_e, ["SP", "SE", "SF", "SY"]):
+                        next_tag_wo_sp = None
+                        for j in range(i + 1, len(tags)):
+                            if check_pos(tags[j], Pos.SP | Pos.SE | Pos.SF | Pos.SY):
                                 continue
-                            next_eojeol_wo_sp = _e
+                            next_tag_wo_sp = tags[j]
                             break
 
                         if (
-                            next_eojeol_wo_sp is not None
-                            and not check_pos(next_eojeol_wo_sp, ["J", "XSN"])
+                            next_tag_wo_sp is not None
+                            and not check_pos(next_tag_wo_sp, Pos.J | Pos.XSN)
                         ):
                             cur_stat = Stats.EOMI
                         # 일반적으로 적용할 수 있는 어미세트 NEXT 세트 적용.
         else:
-            if eojeol.eojeol in Const.double_quotes:
+            if symbol & Symbol.DOUBLE_QUOTE:
                 last_double_pos = i
 
-            elif eojeol.eojeol in Const.single_quotes:
+            elif symbol & Symbol.SINGLE_QUOTE:
                 last_single_pos = i
 
-            elif eojeol.eojeol in Const.brackets:
+            elif symbol & Symbol.BRACKET:
                 last_bracket_pos = i
 
             endif = False
             if not endif:
                 # Space
-                if eojeol.eojeol == " " or Table[Stats.COMMON][eojeol.eojeol] & ID.CONT:
-                    if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+                if symbol & Symbol.SPACE or transitions[Stats.COMMON][cls] & ID.CONT:
+                    if transitions[cur_stat][prev_cls] & ID.NEXT1:
                         results.append(cur_sentence)
                         cur_sentence = [prev]
                         cur_stat = Stats.DEFAULT
                     endif = True
 
             if not endif:
-                if Table[cur_stat][eojeol.eojeol] & ID.NEXT:
-                    if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+                if transitions[cur_stat][cls] & ID.NEXT:
+                    if transitions[cur_stat][prev_cls] & ID.NEXT1:
                         # NEXT1 + NEXT => 자르지 않는다.
                         cur_sentence.append(prev)
 
-                    elif prev_non_space.eojeol in Table[Stats.COMMON]:
+                    elif symbols[prev_non_space_cls] & Symbol.COMMON:
                         # NEW RULE for KSS 3 to fix following issue.
                         # https://github.com/hyunwoongko/kss/issues/7
 
-                        if not check_pos(eojeol, ["EC", "VC"]):
+                        if not check_pos(tags[i], Pos.EC | Pos.VC):
                             # "말했다. 고한다." => 고(EC): not segment
                             # "말했다. 고구려는" => 고(NNG): segment
                             results.append(cur_sentence)
@@ -486,8 +1161,8 @@ def _split_sentences(
                     endif = True
 
             if not endif:
-                if Table[cur_stat][eojeol.eojeol] & ID.NEXT1:
-                    if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+                if transitions[cur_stat][cls] & ID.NEXT1:
+                    if transitions[cur_stat][prev_cls] & ID.NEXT1:
                         # NEXT1 + NEXT1 => 자른다.
                         results.append(cur_sentence)
                         cur_sentence = [prev]
@@ -495,14 +1170,14 @@ def _split_sentences(
                     endif = True
 
             if not endif:
-                if Table[cur_stat][eojeol.eojeol] & ID.NEXT2:
-                    if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+                if transitions[cur_stat][cls] & ID.NEXT2:
+                    if transitions[cur_stat][prev_cls] & ID.NEXT1:
                         # NEXT1 + NEXT2 => 자르지 않는다.
                         cur_sentence.append(prev)
                     else:
                         # "말했다. 고한다." => 고(EC): not segmentt
                         # "말했다. 고구려는" => 고(NNG): segment
-                        if not check_pos(eojeol, ["EC"]):
+                        if not check_pos(tags[i], Pos.EC):
                             # NOT(NEXT1) + NEXT2 => 자른다.
                             results.append(cur_sentence)
                             cur_sentence = []
@@ -512,138 +1187,366 @@ def _split_sentences(
 
             if not endif:
                 if (
-                    not Table[cur_stat][eojeol.eojeol]
-                    or Table[cur_stat][eojeol.eojeol] & ID.PREV
+                    not transitions[cur_stat][cls]
+                    or transitions[cur_stat][cls] & ID.PREV
                 ):  # NOT exists
 
-                    if eojeol.eojeol not in Const.not_endpoint:
+                    if not symbol & Symbol.NOT_ENDPOINT:
                         results.append(cur_sentence)
                         cur_sentence = []
-                        if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+                        if transitions[cur_stat][prev_cls] & ID.NEXT1:
                             cur_sentence.append(prev)
 
                     cur_stat = Stats.DEFAULT
 
-                    if eojeol.eojeol in Const.double_quotes:
+                    if symbol & Symbol.DOUBLE_QUOTE:
                         if use_quotes_brackets_processing:
                             if (
-                                eojeol.eojeol
+                                eojeol
                                 in Const.double_quotes_open_to_close.keys()
                             ):
                                 double_quote_pop = do_push_pop_symbol(
                                     double_stack,
-                                    Const.double_quotes_open_to_close[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.double_quotes_open_to_close[eojeol],
+                                    eojeol,
                                 )
                             else:
                                 double_quote_pop = do_push_pop_symbol(
                                     double_stack,
-                                    Const.double_quotes_close_to_open[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.double_quotes_close_to_open[eojeol],
+                                    eojeol,
                                 )
 
-                    elif eojeol.eojeol in Const.single_quotes:
+                    elif symbol & Symbol.SINGLE_QUOTE:
                         if use_quotes_brackets_processing:
                             if (
-                                eojeol.eojeol
+                                eojeol
                                 in Const.single_quotes_open_to_close.keys()
                             ):
                                 single_quote_pop = do_push_pop_symbol(
                                     single_stack,
-                                    Const.single_quotes_open_to_close[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.single_quotes_open_to_close[eojeol],
+                                    eojeol,
                                 )
                             else:
                                 single_quote_pop = do_push_pop_symbol(
                                     single_stack,
-                                    Const.single_quotes_close_to_open[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.single_quotes_close_to_open[eojeol],
+                                    eojeol,
                                 )
 
-                    elif eojeol.eojeol in Const.brackets:
+                    elif symbol & Symbol.BRACKET:
                         if use_quotes_brackets_processing:
-                            if eojeol.eojeol in Const.bracket_open_to_close.keys():
+                            if eojeol in Const.bracket_open_to_close.keys():
                                 bracket_pop = do_push_pop_symbol(
                                     bracket_stack,
-                                    Const.bracket_open_to_close[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.bracket_open_to_close[eojeol],
+                                    eojeol,
                                 )
                             else:
                                 bracket_pop = do_push_pop_symbol(
                                     bracket_stack,
-                                    Const.bracket_close_to_open[eojeol.eojeol],
-                                    eojeol.eojeol,
+                                    Const.bracket_close_to_open[eojeol],
+                                    eojeol,
                                 )
 
-        if cur_stat == Stats.DEFAULT or not (Table[cur_stat][eojeol.eojeol] & ID.NEXT1):
+        if cur_stat == Stats.DEFAULT or not (transitions[cur_stat][cls] & ID.NEXT1):
             cur_sentence.append(eojeol)
 
         prev = eojeol
+        prev_cls = cls
 
-        if eojeol.eojeol != " ":
-            prev_non_space = eojeol
+        if not symbol & Symbol.SPACE:
+            prev_non_space_cls = cls
 
     if not empty(cur_sentence, dim=1):
         results.append(cur_sentence)
         cur_sentence = []
 
-    if Table[cur_stat][prev.eojeol] & ID.NEXT1:
+    if transitions[cur_stat][prev_cls] & ID.NEXT1:
         cur_sentence.append(prev)
         results.append(cur_sentence)
 
-    results = prep.tostring(results)
-
-    if use_heuristic is True:
-        results = post.apply_heuristic(text, results, use_morpheme)
-
-    kwargs = {
-        "use_heuristic": use_heuristic,
-        "use_quotes_brackets_processing": use_quotes_brackets_processing,
-        "max_recover_step": max_recover_step,
-        "max_recover_length": max_recover_length,
-        "backend": backend,
-        "recover_step": recover_step + 1,
-    }
-
-    if recover_step < max_recover_step:
-        if len(single_stack) != 0:
-            results = _realign_by_quotes(
-                text,
-                last_single_pos,
-                single_quote_pop,
-                **kwargs,
-            )
-        if len(double_stack) != 0:
-            results = _realign_by_quotes(
-                text,
-                last_double_pos,
-                double_quote_pop,
-                **kwargs,
-            )
-        if len(bracket_stack) != 0:
-            results = _realign_by_quotes(
-                text,
-                last_bracket_pos,
-                bracket_pop,
-                **kwargs,
-            )
+    if len(bracket_stack) != 0:
+        misaligned = last_bracket_pos, bracket_pop
+    elif len(double_stack) != 0:
+        misaligned = last_double_pos, double_quote_pop
+    elif len(single_stack) != 0:
+        misaligned = last_single_pos, single_quote_pop
+    else:
+        misaligned = None
 
-    outputs = []
-    for s in results:
-        s = prep.restore(s)
-        if use_quotes_brackets_processing:
-            s = s.replace("\u200b", "")
-        outputs.append(s)
+    return results, misaligned
 
-    return outputs
 
+def _split_eojeols_unquoted(tokens, use_heuristic, use_morpheme):
+    """
+    `_split_eojeols` without quotes and brackets processing.
+
+    Stacks of quotes and brackets are always empty, so they are dropped,
+    and the heuristic rule of each character class is looked up in `_table.endings`
+    instead of checking the options for every character.
+
+    Returns:
+        List[List[str]]: eojeols of each sentence
+    """
+    text, tags = tokens.text, tokens.tags
+    classes = _table.classify(text)
+    symbols = _table.symbols
+    transitions = _table.transitions
+    endings = _table.endings[use_heuristic, use_morpheme]
+    use_eomi = use_heuristic and use_morpheme
+    common_transitions = transitions[Stats.COMMON]
+    sb_transitions = transitions[Stats.SB]
+    last = len(text) - 1
+
+    results = []
+    cur_sentence = []
+    prev = ""
+    prev_cls = prev_non_space_cls = _table.classes[prev]
+    cur_stat = Stats.DEFAULT
+
+    for i, eojeol in enumerate(text):
+        cls = classes[i]
+        symbol = symbols[cls]
+
+        if cur_stat == Stats.DEFAULT:
+            if symbol & Symbol.SB:
+                if sb_transitions[prev_cls] & ID.PREV:
+                    if not use_morpheme:
+                        cur_stat = Stats.SB
+                    elif i != 0 and check_pos(tags[i - 1], Pos.EF | Pos.ETN):
+                        cur_stat = Stats.SB
+
+            ending = endings[cls]
+            if ending:
+                if (
+                    transitions[ending][prev_cls] & ID.PREV
+                    and check_pos(tags[i], Pos.EF)
+                ):
+                    if use_morpheme:
+                        cur_stat = ending
+                    elif i != last and symbols[classes[i + 1]] & Symbol.ENDPOINT:
+                        cur_stat = ending
+
+            elif use_eomi:
+                if (
+                    i != last
+                    and check_pos(tags[i], Pos.ETN | Pos.EF)
+                    and check_pos(tags[i + 1], Pos.SP | Pos.SE | Pos.SF | Pos.SY)
+                    and not check_pos(tags[i + 1], Pos.J | Pos.XSN)
+                    and not check_pos(tags[i], Pos.J | Pos.XSN)
+                    and eojeol not in ["다", "요", "죠", "기"]
+                ):
+                    next_tag_wo_sp = None
+                    for j in range(i + 1, len(tags)):
+                        if check_pos(tags[j], Pos.SP | Pos.SE | Pos.SF | Pos.SY):
+                            continue
+                        next_tag_wo_sp = tags[j]
+                        break
+
+                    if (
+                        next_tag_wo_sp is not None
+                        and not check_pos(next_tag_wo_sp, Pos.J | Pos.XSN)
+                    ):
+                        cur_stat = Stats.EOMI
+        else:
+            state_transitions = transitions[cur_stat]
+            if symbol & Symbol.SPACE or common_transitions[cls] & ID.CONT:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    results.append(cur_sentence)
+                    cur_sentence = [prev]
+                    cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    # NEXT1 + NEXT => 자르지 않는다.
+                    cur_sentence.append(prev)
+
+                elif symbols[prev_non_space_cls] & Symbol.COMMON:
+                    if not check_pos(tags[i], Pos.EC | Pos.VC):
+                        results.append(cur_sentence)
+                        cur_sentence = []
+
+                cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT1:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    # NEXT1 + NEXT1 => 자른다.
+                    results.append(cur_sentence)
+                    cur_sentence = [prev]
+                    cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT2:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    # NEXT1 + NEXT2 => 자르지 않는다.
+                    cur_sentence.append(prev)
+                elif not check_pos(tags[i], Pos.EC):
+                    # NOT(NEXT1) + NEXT2 => 자른다.
+                    results.append(cur_sentence)
+                    cur_sentence = []
+
+                cur_stat = Stats.DEFAULT
+
+            elif not state_transitions[cls] or state_transitions[cls] & ID.PREV:
+                if not symbol & Symbol.NOT_ENDPOINT:
+                    results.append(cur_sentence)
+                    cur_sentence = []
+                    if state_transitions[prev_cls] & ID.NEXT1:
+                        cur_sentence.append(prev)
+
+                cur_stat = Stats.DEFAULT
+
+        if cur_stat == Stats.DEFAULT or not (transitions[cur_stat][cls] & ID.NEXT1):
+            cur_sentence.append(eojeol)
+
+        prev = eojeol
+        prev_cls = cls
+
+        if not symbol & Symbol.SPACE:
+            prev_non_space_cls = cls
+
+    if len(cur_sentence) != 0:
+        results.append(cur_sentence)
+        cur_sentence = []
+
+    if transitions[cur_stat][prev_cls] & ID.NEXT1:
+        cur_sentence.append(prev)
+        results.append(cur_sentence)
+
+    return results
+
+
+def _split_eojeols_by_candidates(text, use_heuristic):
+    """
+    `_split_eojeols_unquoted` for the none backend.
+
+    Every eojeol is tagged EF+ETN, so only sentence boundary symbols and endings of the heuristic rules
+    can leave the default state. They are found by a precompiled pattern, the rules are evaluated
+    from each of them until the default state is reached again, and the characters in between
+    are copied to the sentence at once. (so a sentence is a list of strings, not of characters)
+
+    Returns:
+        List[List[str]]: pieces of each sentence
+    """
+    classes = _table.classes
+    symbols = _table.symbols
+    transitions = _table.transitions
+    endings = _table.endings[use_heuristic, False]
+    candidates = _table.candidates[use_heuristic]
+    common_transitions = transitions[Stats.COMMON]
+    sb_transitions = transitions[Stats.SB]
+    length = len(text)
+
+    results = []
+    cur_sentence = []
+    prev = ""
+    prev_cls = prev_non_space_cls = classes[prev]
+    cur_stat = Stats.DEFAULT
+
+    i = 0
+    while i < length:
+        if cur_stat == Stats.DEFAULT:
+            match = candidates.search(text, i)
+            end = length if match is None else match.start()
+            if end > i:
+                stretch = text[i:end]
+                cur_sentence.append(stretch)
+                prev = stretch[-1]
+                prev_cls = classes.get(prev, 0)
+
+                stretch = stretch.rstrip(" ")
+                if len(stretch) != 0:
+                    prev_non_space_cls = classes.get(stretch[-1], 0)
+
+                i = end
+                if i == length:
+                    break
+
+        eojeol = text[i]
+        cls = classes.get(eojeol, 0)
+        symbol = symbols[cls]
+
+        if cur_stat == Stats.DEFAULT:
+            if symbol & Symbol.SB and sb_transitions[prev_cls] & ID.PREV:
+                cur_stat = Stats.SB
+
+            ending = endings[cls]
+            if (
+                ending
+                and transitions[ending][prev_cls] & ID.PREV
+                and i != length - 1
+                and symbols[classes.get(text[i + 1], 0)] & Symbol.ENDPOINT
+            ):
+                cur_stat = ending
+        else:
+            # EC and VC are never tagged, so the rules which check them always segment.
+            state_transitions = transitions[cur_stat]
+            if symbol & Symbol.SPACE or common_transitions[cls] & ID.CONT:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    results.append(cur_sentence)
+                    cur_sentence = [prev]
+                    cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    cur_sentence.append(prev)
+                elif symbols[prev_non_space_cls] & Symbol.COMMON:
+                    results.append(cur_sentence)
+                    cur_sentence = []
+
+                cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT1:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    results.append(cur_sentence)
+                    cur_sentence = [prev]
+                    cur_stat = Stats.DEFAULT
+
+            elif state_transitions[cls] & ID.NEXT2:
+                if state_transitions[prev_cls] & ID.NEXT1:
+                    cur_sentence.append(prev)
+                else:
+                    results.append(cur_sentence)
+                    cur_sentence = []
+
+                cur_stat = Stats.DEFAULT
+
+            elif not state_transitions[cls] or state_transitions[cls] & ID.PREV:
+                if not symbol & Symbol.NOT_ENDPOINT:
+                    results.append(cur_sentence)
+                    cur_sentence = []
+                    if state_transitions[prev_cls] & ID.NEXT1:
+                        cur_sentence.append(prev)
+
+                cur_stat = Stats.DEFAULT
+
+        if cur_stat == Stats.DEFAULT or not (transitions[cur_stat][cls] & ID.NEXT1):
+            cur_sentence.append(eojeol)
 
-def _realign_by_quotes(text, last_quote_pos, quote_type, **kwargs):
-    before_quote = _split_sentences(text[:last_quote_pos], **kwargs)
+        prev = eojeol
+        prev_cls = cls
+
+        if not symbol & Symbol.SPACE:
+            prev_non_space_cls = cls
+
+        i += 1
+
+    if len(cur_sentence) != 0:
+        results.append(cur_sentence)
+        cur_sentence = []
+
+    if transitions[cur_stat][prev_cls] & ID.NEXT1:
+        cur_sentence.append(prev)
+        results.append(cur_sentence)
+
+    return results
+
+
+def _realign_by_quotes(before_quote, after_quote, quote_type):
     before_last = before_quote[-1] if len(before_quote) > 0 else ""
     before_quote = [] if len(before_quote) == 1 else before_quote[:-1]
 
-    after_quote = _split_sentences(text[last_quote_pos + 1 :], **kwargs)
     after_first = after_quote[0] if len(after_quote) > 0 else ""
     after_quote = [] if len(after_quote) == 1 else after_quote[1:]
 
@@ -653,15 +1556,14 @@ def _realign_by_quotes(text, last_quote_pos, quote_type, **kwargs):
 
 def _split_chunks(
     text: str,
+    offsets: List[Tuple[int, int]],
     max_length: int,
     overlap: bool = False,
-    **kwargs,
 ) -> List[str]:
 
     span, chunks = [], []
-    text = preprocess_text(text)
 
-    for index in _split_sentences_index(text, **kwargs):
+    for index in offsets:
         if len(span) > 0:
             if index[0] - span[0][1] > max_length:
                 chunk = get_chunk_with_index(text, span)
@@ -677,20 +1579,3 @@ def _split_chunks(
     if chunk is not None:
         chunks.append(chunk)
     return chunks
-
-
-def _split_sentences_index(text, **kwargs) -> List[Tuple[int, int]]:
-    sentences = split_sentences(text, **kwargs)
-    offset, sentence_indexes = 0, []
-
-    for sentence in sentences:
-        sentence_indexes.append(
-            (
-                offset + text.index(sentence),
-                offset + text.index(sentence) + len(sentence),
-            )
-        )
-        offset += text.index(sentence) + len(sentence)
-        text = text[text.index(sentence) + len(sentence) :]
-
-    return sentence_indexes
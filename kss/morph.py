@@ -11,6 +11,7 @@
 # of the BSD license.  See the LICENSE file for details.
 
 import logging
+import platform
 from typing import List, Tuple
 from kss.pynori.korean_analyzer import KoreanAnalyzer
 
@@ -42,6 +43,25 @@ class MorphExtractor(object):
     def __init__(self):
         self.mecab = None
         self.pynori = None
+        self.mecab_available = None
+        self.auto_backend = None
+
+    def create_mecab(self):
+        if self.mecab is None:
+            try:
+                self.mecab = MecabTokenizer()
+            except ImportError:
+                self.mecab_available = False
+                raise ImportError(
+                    "\n"
+                    "You must install `python-mecab-kor` if you want to use `mecab` backend.\n"
+                    "Please install using `pip install python-mecab-kor`.\n"
+                    "Refer https://github.com/hyuwoongko/python-mecab-kor for more details.\n"
+                )
+
+            self.mecab_available = True
+
+        return self.mecab
 
     def create_pynori(self):
         if self.pynori is None:
@@ -58,8 +78,55 @@ class MorphExtractor(object):
                 mode_synonym=False,
             )
 
+        return self.pynori
+
+    def available_backends(self) -> List[str]:
+        """
+        Get available backends in this process.
+        mecab is probed only once and the created instance is reused for analysis.
+
+        Returns:
+            List[str]: list of available backends
+        """
+        if self.mecab_available is None:
+            try:
+                self.create_mecab()
+            except ImportError:
+                pass
+
+        backends = ["mecab"] if self.mecab_available else []
+        return backends + ["pynori", "none"]
+
+    def resolve_backend(self, backend: str) -> str:
+        """
+        Resolve `auto` backend to the fastest available backend.
+        The result is cached for the process.
+
+        Args:
+            backend (str): backend name
+
+        Returns:
+            str: resolved backend name
+        """
+        if backend != "auto":
+            return backend
+
+        if self.auto_backend is None:
+            if "mecab" in self.available_backends():
+                self.auto_backend = "mecab"
+            else:
+                if platform.uname().system in ["Darwin", "Linux"]:
+                    logging.warning(
+                        "You can install `python-mecab-kor` for faster kss execution.\n"
+                        "Try to install it using `pip install python-mecab-kor`.\n"
+                        "Refer https://github.com/hyuwoongko/python-mecab-kor for more details.\n"
+                    )
+                self.auto_backend = "pynori"
+
+        return self.auto_backend
+
     def pos(self, text, backend):
-        from kss.base import Eojeol
+        from kss.base import Tokens
 
         if backend.lower() == "pynori":
             _pos = self.pynori.do_analysis(
@@ -67,29 +134,10 @@ class MorphExtractor(object):
                 preprocessed=True,
             )
 
-            return [
-                Eojeol(eojeol, pos[1])
-                for pos in zip(_pos["termAtt"], _pos["posTagAtt"])
-                for eojeol in pos[0]
-            ]
+            return Tokens.from_pos(zip(_pos["termAtt"], _pos["posTagAtt"]))
 
         elif backend.lower() == "mecab":
-            if not self.mecab:
-                try:
-                    self.mecab = MecabTokenizer()
-                except ImportError:
-                    raise ImportError(
-                        "\n"
-                        "You must install `python-mecab-kor` if you want to use `mecab` backend.\n"
-                        "Please install using `pip install python-mecab-kor`.\n"
-                        "Refer https://github.com/hyuwoongko/python-mecab-kor for more details.\n"
-                    )
-
-            return [
-                Eojeol(eojeol, pos[1])
-                for pos in self.mecab.pos(text)
-                for eojeol in pos[0]
-            ]
+            return Tokens.from_pos(self.create_mecab().pos(text))
         else:
             raise AttributeError(
                 "Wrong backend ! currently, we only support `pynori`, `mecab`, `none`, `auto` backend."
@@ -0,0 +1,234 @@
+"""
+Compile mecab-ko-dic into the binary dictionary loaded by pynori.
+
+usage: python -m kss.pynori.build_dict [--dic DIR] [--matrix PATH] [--output PATH]
+                                      [--profile {full,segmentation}]
+
+`--matrix` accepts the text `matrix.def` of mecab-ko-dic or the binary
+`matrix.bin` of a compiled mecab dictionary.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import struct
+import time
+from array import array
+
+from kss.pynori.dict.compiled_dictionary import SECTIONS, write_compiled_dictionary
+from kss.pynori.dict.dictionary import Dictionary
+from kss.pynori.dict.entry_table import EntryTable
+from kss.pynori.dict.trie import Trie
+from kss.pynori.dict.unknown_dictionary import UnknownDictionary
+from kss.pynori.korean_tokenizer import PATH_COMPILED_DICT, PATH_CUR, DictProfile
+from kss.pynori.pos import POS
+
+PATH_DIC = PATH_CUR + "/resources/mecab-ko-dic-2.1.1-20180720"
+
+_pos_types = {
+    "Inflect": POS.Type.INFLECT,
+    "Compound": POS.Type.COMPOUND,
+    "Preanalysis": POS.Type.PREANALYSIS,
+}
+
+
+def read_csv_entries(dic_dir):
+    """
+    Read entries of every csv file in mecab-ko-dic.
+
+    Yields:
+        (surface, morph_inf) in file order, without duplicated rows
+    """
+    rows = set()
+    for path in sorted(glob.glob(os.path.join(dic_dir, "*.csv"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for splits in csv.reader(f):
+                if len(splits) < 12 or tuple(splits) in rows:
+                    continue
+                rows.add(tuple(splits))
+
+                morphemes = None
+                if splits[11] != "*":
+                    morphemes = []
+                    for morpheme in splits[11].split("+"):
+                        surface, pos_tag = morpheme.split("/")[:2]
+                        morphemes.append(
+                            Dictionary.Morpheme(posTag=pos_tag, surfaceForm=surface)
+                        )
+
+                yield splits[0], {
+                    "surface": splits[0],
+                    "left_id": int(splits[1]),
+                    "right_id": int(splits[2]),
+                    "word_cost": int(splits[3]),
+                    "POS": splits[4],
+                    "POS_type": _pos_types.get(splits[8], POS.Type.MORPHEME),
+                    "morphemes": morphemes,
+                }
+
+
+# proper nouns longer than this are dropped by the segmentation profile.
+# short ones (e.g. 조선대, 캔디) decide whether the preceding
+# syllables are read as an ending, dropping them moves boundaries.
+SEGMENTATION_MAX_NNP_LENGTH = 4
+
+
+def segmentation_entries(entries):
+    """
+    Reduce entries to what sentence segmentation needs.
+
+    kss reads only surfaces and POS tags with decompounding off, so
+    morphemes are dropped and entries that differ only by them are merged
+    into the cheapest one. Long proper nouns (NNP) are dropped as well,
+    unknown words of the same length are tagged as nouns anyway.
+
+    Yields:
+        (surface, morph_inf) in the order of the first entry of each group
+    """
+    groups = {}
+    for surface, morph_inf in entries:
+        if (
+            morph_inf["POS"] == "NNP"
+            and len(surface) > SEGMENTATION_MAX_NNP_LENGTH
+        ):
+            continue
+
+        key = (surface, morph_inf["left_id"], morph_inf["right_id"], morph_inf["POS"])
+        if key not in groups or morph_inf["word_cost"] < groups[key]["word_cost"]:
+            groups[key] = dict(
+                morph_inf, POS_type=POS.Type.MORPHEME, morphemes=None
+            )
+
+    for key, morph_inf in groups.items():
+        yield key[0], morph_inf
+
+
+def read_matrix(path):
+    """
+    Read connection costs from matrix.def or matrix.bin.
+
+    Returns:
+        Tuple[int, int, array]: size of right ids, size of left ids,
+            and costs where cost of (right, left) is at right * size of left ids + left.
+    """
+    if path.endswith(".bin"):
+        with open(path, "rb") as f:
+            num_rights, num_lefts = struct.unpack("<HH", f.read(4))
+            costs = array("h")
+            costs.frombytes(f.read())
+
+        # matrix.bin is stored column-major
+        matrix = array("h", bytes(2 * num_rights * num_lefts))
+        for right in range(num_rights):
+            matrix[right * num_lefts : (right + 1) * num_lefts] = costs[
+                right::num_rights
+            ]
+        return num_rights, num_lefts, matrix
+
+    with open(path, "r", encoding="utf-8") as f:
+        num_rights, num_lefts = map(int, f.readline().split())
+        matrix = array("h", bytes(2 * num_rights * num_lefts))
+        for line in f:
+            right, left, cost = line.split()
+            matrix[int(right) * num_lefts + int(left)] = int(cost)
+
+    return num_rights, num_lefts, matrix
+
+
+def build_dictionary(dic_dir, matrix_path, profile=DictProfile.FULL):
+    """
+    Build sections of the compiled dictionary.
+
+    Args:
+        profile (str): `DictProfile.FULL` or `DictProfile.SEGMENTATION`
+
+    Returns:
+        Dict[str, array]: sections for `write_compiled_dictionary`
+    """
+    entries = read_csv_entries(dic_dir)
+    if profile == DictProfile.SEGMENTATION:
+        entries = segmentation_entries(entries)
+    trie = Trie.build(entries, EntryTable())
+    table = trie.table
+
+    unk_path = os.path.join(dic_dir, "unk.def")
+    with open(unk_path, "r", encoding="utf-8") as f:
+        categories = sorted({line.split(",")[0] for line in f if line.strip()})
+
+    unk_keys, unk_entries = array("I"), array("I")
+    unk_dict = UnknownDictionary.open(unk_path)
+    for category in categories:
+        unk_keys.append(table.string_id(category))
+        unk_entries.append(table.append(unk_dict.unkTrie[category].result[0]))
+        trie.entry_next.append(-1)
+
+    num_rights, num_lefts, matrix = read_matrix(matrix_path)
+
+    sections = dict(
+        alphabet=array("I", trie.alphabet),
+        base=trie.base,
+        check=trie.check,
+        value=trie.value,
+        key_head=trie.key_head,
+        entry_next=trie.entry_next,
+        unk_keys=unk_keys,
+        unk_entries=unk_entries,
+        matrix_shape=array("I", [num_rights, num_lefts]),
+        matrix=matrix,
+    )
+    sections.update((name, table.columns[name]) for name in EntryTable.COLUMNS)
+    assert set(sections.keys()) == set(SECTIONS.keys())
+    return sections
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m kss.pynori.build_dict",
+        description="Compile mecab-ko-dic into the binary dictionary of pynori.",
+    )
+    parser.add_argument(
+        "--dic",
+        default=PATH_DIC,
+        help="mecab-ko-dic directory that contains the csv files and unk.def",
+    )
+    parser.add_argument(
+        "--matrix",
+        default=None,
+        help="matrix.def or matrix.bin (default: matrix.def in --dic)",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="output path (default: the path pynori loads the profile from)",
+    )
+    parser.add_argument(
+        "--profile",
+        default=DictProfile.FULL,
+        choices=list(PATH_COMPILED_DICT.keys()),
+        help="'segmentation' builds a reduced dictionary for sentence splitting",
+    )
+    args = parser.parse_args(args)
+    output = args.output or PATH_CUR + PATH_COMPILED_DICT[args.profile]
+
+    matrix_path = args.matrix or os.path.join(args.dic, "matrix.def")
+    if not os.path.exists(matrix_path):
+        parser.error(
+            f"can not find '{matrix_path}'. mecab-ko-dic bundled with kss does not "
+            f"contain matrix.def, please give the path of it with --matrix."
+        )
+
+    start = time.time()
+    sections = build_dictionary(args.dic, matrix_path, args.profile)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    write_compiled_dictionary(output, sections)
+
+    print(
+        f"[Korean Sentence Splitter]: {len(sections['key_head'])} surfaces, "
+        f"{len(sections['left_id'])} entries -> {output} "
+        f"({os.path.getsize(output) / 2 ** 20:.1f} MB, {time.time() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,7 @@ Reference: `char.def` file.
 """
 from collections import defaultdict
 
-import emoji
-import regex
-
-_emojis = {}
-for lang in ["pt", "it", "es", "en"]:
-    _emojis.update(emoji.UNICODE_EMOJI[lang])
-
-
-def get_emoji(text):
-    emoji_list = []
-    flags = regex.findall("[\U0001F1E6-\U0001F1FF]", text)
-
-    for grapheme in regex.findall(r"\X", text):
-        if any(char in _emojis for char in grapheme):
-            emoji_list.append(grapheme)
-
-    return emoji_list + flags
-
+from kss._emoji import _emojis, unicodes
 
 categories = defaultdict(
     lambda: None,
@@ -44748,10 +44731,96 @@ categories = defaultdict(
 )
 
 
+CATEGORY_NAMES = [
+    None,
+    "DEFAULT",
+    "SPACE",
+    "HANJA",
+    "KANJI",
+    "SYMBOL",
+    "NUMERIC",
+    "ALPHA",
+    "HANGUL",
+    "HIRAGANA",
+    "KATAKANA",
+    "HANJANUMERIC",
+    "GREEK",
+    "CYRILLIC",
+    "EMOJI",
+]
+CATEGORY_MASK = 0x0F
+FLAG_UNICODE = 0x10  # zero width joiner and variation selectors
+
+_category_ids = {name: i for i, name in enumerate(CATEGORY_NAMES)}
+
+
+def _build_char_table():
+    """
+    Build codepoint -> flags table.
+
+    Lower 4 bits hold the index of the category in `CATEGORY_NAMES`.
+    BMP codepoints are stored in a bytearray and the astral ones
+    (mostly emojis) in a small dict.
+    """
+    bmp, astral = bytearray(0x10000), {}
+
+    def _set(code, value):
+        if code < 0x10000:
+            bmp[code] = (bmp[code] & ~CATEGORY_MASK) | value
+        else:
+            astral[code] = (astral.get(code, 0) & ~CATEGORY_MASK) | value
+
+    for code, name in categories.items():
+        _set(code, _category_ids[name])
+
+    for e in _emojis:
+        if len(e) == 1:
+            _set(ord(e), _category_ids["EMOJI"])
+
+    for code in range(0x1F1E6, 0x1F200):  # regional indicator symbols (flags)
+        _set(code, _category_ids["EMOJI"])
+
+    for u in unicodes:
+        code = ord(u)
+        if code < 0x10000:
+            bmp[code] |= FLAG_UNICODE
+        else:
+            astral[code] = astral.get(code, 0) | FLAG_UNICODE
+
+    return bmp, astral
+
+
+_bmp_table, _astral_table = _build_char_table()
+
+
+def get_char_flags(code):
+    if code < 0x10000:
+        return _bmp_table[code]
+    return _astral_table.get(code, 0)
+
+
+def get_char_ranges():
+    """
+    Get the codepoint ranges of the characters that have any flag.
+
+    Returns:
+        List[Tuple[int, int]]: list of (first, last) codepoints
+    """
+    codes = [c for c in range(0x10000) if _bmp_table[c] != 0]
+    codes += sorted(c for c, v in _astral_table.items() if v != 0)
+
+    ranges = []
+    for code in codes:
+        if len(ranges) != 0 and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+
+    return [tuple(r) for r in ranges]
+
+
 def character_category_map(ch):
-    if len(get_emoji(ch)) != 0:
-        return "EMOJI"
-    return categories[ord(ch)]
+    return CATEGORY_NAMES[get_char_flags(ord(ch)) & CATEGORY_MASK]
 
 
 """
@@ -0,0 +1,117 @@
+"""
+Compiled dictionary
+
+Binary image of mecab-ko-dic built by `python -m kss.pynori.build_dict`.
+It is opened with mmap, so loading costs a header parse regardless of
+the dictionary size.
+
+Layout (little endian):
+    header:   MAGIC, version (u32), number of sections (u32)
+    sections: name (16s), typecode (c), offset (u64), count (u64)
+    body:     section data, each aligned to 8 bytes
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"KSSPYNOR"
+VERSION = 3
+
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16sc7xQQ")
+
+# alphabet, base, check, value, key_head, entry_next: arrays of `Trie`
+# left_id ~ str_data: columns of `EntryTable`
+# unk_keys, unk_entries: string id of character category -> entry (from unk.def)
+# matrix_shape: (size of right ids, size of left ids)
+# matrix: cost of (right, left) at right * size of left ids + left
+SECTIONS = {
+    "alphabet": "I",
+    "base": "i",
+    "check": "i",
+    "value": "i",
+    "key_head": "i",
+    "entry_next": "i",
+    "left_id": "H",
+    "right_id": "H",
+    "word_cost": "i",
+    "pos": "I",
+    "pos_type": "B",
+    "morph_offsets": "I",
+    "morph_tag": "I",
+    "morph_surface": "I",
+    "str_offsets": "I",
+    "str_data": "B",
+    "unk_keys": "I",
+    "unk_entries": "I",
+    "matrix_shape": "I",
+    "matrix": "h",
+}
+
+
+def write_compiled_dictionary(path, sections):
+    """
+    Write sections into a compiled dictionary file.
+
+    Args:
+        path (str): output path
+        sections (Dict[str, array]): every section in `SECTIONS`
+    """
+    assert set(sections.keys()) == set(SECTIONS.keys()), "missing or unknown sections"
+
+    header_size = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table, blobs, offset = [], [], header_size
+    for name, typecode in SECTIONS.items():
+        data = array(typecode, sections[name])
+        if sys.byteorder != "little":
+            data.byteswap()
+
+        offset += -offset % 8
+        table.append(_SECTION.pack(name.encode(), typecode.encode(), offset, len(data)))
+        blobs.append((offset, data.tobytes()))
+        offset += len(blobs[-1][1])
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(SECTIONS)))
+        f.write(b"".join(table))
+        for offset, blob in blobs:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+
+
+class CompiledDictionary(object):
+    """mmap-ed view of a compiled dictionary file."""
+
+    @staticmethod
+    def open(path):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompiledDictionary(buffer)
+
+    def __init__(self, buffer):
+        magic, version, num_sections = _HEADER.unpack_from(buffer, 0)
+        assert magic == MAGIC, "not a compiled pynori dictionary"
+        assert version == VERSION, (
+            f"compiled dictionary version {version} is not supported, "
+            f"please rebuild it with `python -m kss.pynori.build_dict`"
+        )
+
+        self.buffer = buffer
+        self.sections = {}
+        view = memoryview(buffer)
+        for i in range(num_sections):
+            name, typecode, offset, count = _SECTION.unpack_from(
+                buffer, _HEADER.size + _SECTION.size * i
+            )
+            name, typecode = name.rstrip(b"\0").decode(), typecode.decode()
+            size = array(typecode).itemsize * count
+            data = view[offset : offset + size].cast(typecode)
+            if sys.byteorder != "little":
+                data = array(typecode, data)
+                data.byteswap()
+            self.sections[name] = data
+
+    def __getitem__(self, name):
+        return self.sections[name]
@@ -6,10 +6,24 @@ Reference: matrix.def
 
 import gzip
 import pickle
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class ConnectionCosts(object):
-    """bi-gram connection cost data 를 관리하는 클래스."""
+    """bi-gram connection cost data 를 관리하는 클래스.
+
+    Costs are kept in a flat int16 buffer (array or mmap-ed memoryview),
+    cost of (rightId, leftId) is at `rightId * numLefts + leftId`.
+    """
+
+    # relax with numpy only when there are enough predecessors,
+    # converting a few python ints to ndarray costs more than the loop.
+    NUMPY_MIN_COUNT = 64
 
     @staticmethod
     def open(KNOWN_PATH):
@@ -18,11 +32,55 @@ class ConnectionCosts(object):
 
         if len(entries) == 0:
             return None
-        else:
-            return ConnectionCosts(entries)
 
-    def __init__(self, total_entries):
-        self.conCosts = total_entries  # 딕셔너리 타입 저장.
+        numLefts = len(entries[0])
+        costs = array("h")
+        for rightId in range(len(entries)):
+            row = entries[rightId]
+            costs.extend([row[leftId] for leftId in range(numLefts)])
+        return ConnectionCosts(costs, numLefts)
+
+    @staticmethod
+    def load(compiled):
+        numRights, numLefts = compiled["matrix_shape"]
+        return ConnectionCosts(compiled["matrix"], numLefts)
+
+    def __init__(self, costs, numLefts):
+        self.costs = costs
+        self.numLefts = numLefts
+        self.np_costs = None
+        if np is not None:
+            self.np_costs = np.frombuffer(costs, dtype=np.int16)
 
     def get(self, rightId, leftId):
-        return self.conCosts[int(rightId)][int(leftId)]
+        return self.costs[rightId * self.numLefts + leftId]
+
+    def relax(self, costs, rightIds, count, leftId):
+        """
+        Find the predecessor with the least cost to be followed by `leftId`.
+
+        Args:
+            costs (List[int]): path costs of the predecessors
+            rightIds (List[int]): right ids of the predecessors
+            count (int): number of the predecessors
+            leftId (int): left id of the next token
+
+        Returns:
+            Tuple[int, int]: least cost and index of the predecessor (first on ties)
+        """
+        if self.np_costs is not None and count >= self.NUMPY_MIN_COUNT:
+            indices = np.array(rightIds[:count], dtype=np.int64)
+            indices *= self.numLefts
+            indices += leftId
+            totals = np.array(costs[:count], dtype=np.int64)
+            totals += self.np_costs[indices]
+            leastIDX = int(totals.argmin())
+            return int(totals[leastIDX]), leastIDX
+
+        matrix, numLefts = self.costs, self.numLefts
+        totals = [
+            costs[idx] + matrix[rightIds[idx] * numLefts + leftId]
+            for idx in range(count)
+        ]
+        leastCost = min(totals)
+        return leastCost, totals.index(leastCost)
@@ -0,0 +1,120 @@
+from array import array
+
+from kss.pynori.dict.compiled_dictionary import SECTIONS
+from kss.pynori.dict.dictionary import Dictionary
+from kss.pynori.pos import POS
+
+POS_TYPES = [
+    POS.Type.MORPHEME,
+    POS.Type.COMPOUND,
+    POS.Type.INFLECT,
+    POS.Type.PREANALYSIS,
+]
+
+
+class EntryTable(object):
+    """
+    Payload table for analysis results (`morph_inf`)
+
+    Every field is kept in a flat column instead of a dict per entry.
+    Strings (POS tags, morphemes) are interned into a utf-8 string table,
+    and morphemes of entry i are in morph_offsets[i] ~ morph_offsets[i + 1].
+    """
+
+    # same typecodes as the sections of a compiled dictionary,
+    # so a built table and an mmap-ed one hold the same values.
+    COLUMNS = {
+        name: SECTIONS[name]
+        for name in [
+            "left_id",
+            "right_id",
+            "word_cost",
+            "pos",
+            "pos_type",
+            "morph_offsets",
+            "morph_tag",
+            "morph_surface",
+            "str_offsets",
+            "str_data",
+        ]
+    }
+
+    @staticmethod
+    def load(columns):
+        """Create table on existing columns (e.g. sections of a compiled dictionary)."""
+        return EntryTable({name: columns[name] for name in EntryTable.COLUMNS})
+
+    def __init__(self, columns=None):
+        if columns is None:
+            columns = {
+                name: array(typecode) for name, typecode in self.COLUMNS.items()
+            }
+            columns["morph_offsets"].append(0)
+            columns["str_offsets"].append(0)
+
+        self.columns = columns
+        self.left_id = columns["left_id"]
+        self.right_id = columns["right_id"]
+        self.word_cost = columns["word_cost"]
+        self.pos = columns["pos"]
+        self.pos_type = columns["pos_type"]
+        self.morph_offsets = columns["morph_offsets"]
+        self.morph_tag = columns["morph_tag"]
+        self.morph_surface = columns["morph_surface"]
+        self.str_offsets = columns["str_offsets"]
+        self.str_data = columns["str_data"]
+        self.string_ids = None
+
+    def __len__(self):
+        return len(self.left_id)
+
+    def string(self, idx):
+        return str(self.str_data[self.str_offsets[idx] : self.str_offsets[idx + 1]], "utf-8")
+
+    def string_id(self, string):
+        if self.string_ids is None:
+            self.string_ids = {
+                self.string(i): i for i in range(len(self.str_offsets) - 1)
+            }
+
+        idx = self.string_ids.get(string)
+        if idx is None:
+            idx = self.string_ids[string] = len(self.str_offsets) - 1
+            self.str_data.extend(string.encode("utf-8"))
+            self.str_offsets.append(len(self.str_data))
+        return idx
+
+    def append(self, morph_inf):
+        self.left_id.append(int(morph_inf["left_id"]))
+        self.right_id.append(int(morph_inf["right_id"]))
+        self.word_cost.append(morph_inf["word_cost"])
+        self.pos.append(self.string_id(morph_inf["POS"]))
+        self.pos_type.append(POS_TYPES.index(morph_inf["POS_type"]))
+        for morpheme in morph_inf["morphemes"] or ():
+            self.morph_tag.append(self.string_id(morpheme.posTag))
+            self.morph_surface.append(self.string_id(morpheme.surfaceForm))
+        self.morph_offsets.append(len(self.morph_tag))
+        return len(self.left_id) - 1
+
+    def get(self, idx, surface):
+        start, end = self.morph_offsets[idx], self.morph_offsets[idx + 1]
+
+        morphemes = None
+        if start != end:
+            morphemes = [
+                Dictionary.Morpheme(
+                    posTag=self.string(self.morph_tag[i]),
+                    surfaceForm=self.string(self.morph_surface[i]),
+                )
+                for i in range(start, end)
+            ]
+
+        return {
+            "surface": surface,
+            "left_id": self.left_id[idx],
+            "right_id": self.right_id[idx],
+            "word_cost": self.word_cost[idx],
+            "POS": self.string(self.pos[idx]),
+            "POS_type": POS_TYPES[self.pos_type[idx]],
+            "morphemes": morphemes,
+        }
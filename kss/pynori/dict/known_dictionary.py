@@ -1,6 +1,7 @@
 import gzip
 import pickle
 
+from kss.pynori.dict.entry_table import EntryTable
 from kss.pynori.dict.trie import Trie
 
 from kss.pynori.dict.dictionary import Dictionary
@@ -23,9 +24,26 @@ class KnownDictionary(Dictionary):
         else:
             return KnownDictionary(entries)
 
-    def __init__(self, entries):
+    @staticmethod
+    def load(compiled):
+        """Load from a `CompiledDictionary` without copying it."""
+        return KnownDictionary(
+            sysTrie=Trie.load(
+                alphabet=compiled["alphabet"],
+                base=compiled["base"],
+                check=compiled["check"],
+                value=compiled["value"],
+                key_head=compiled["key_head"],
+                entry_next=compiled["entry_next"],
+                table=EntryTable.load(compiled),
+            )
+        )
+
+    def __init__(self, entries=None, sysTrie=None):
         super().__init__()
-        self.sysTrie = Trie()
+        if sysTrie is not None:
+            self.sysTrie = sysTrie
+            return
 
         for token, morph_inf in entries:
             if morph_inf["morphemes"] is not None:
@@ -38,4 +56,4 @@ class KnownDictionary(Dictionary):
                         )
                     )
                 morph_inf["morphemes"] = morphemes_list
-            self.sysTrie[token] = morph_inf
+        self.sysTrie = Trie.build(entries, EntryTable())
@@ -1,11 +1,36 @@
+from array import array
+from collections import Counter
+from itertools import repeat
+
+
 class Node(object):
+    """Result of a key: `data` is the key and `result` its payloads."""
+
+    __slots__ = ("key", "data", "result")
+
     def __init__(self, key, data=None, result=None):
         self.key = key
         self.data = data
         self.result = []
         if result is not None:
             self.result.append(result)
-        self.children = dict()
+
+
+class ObjectTable(object):
+    """Payload table that keeps arbitrary python objects."""
+
+    def __init__(self):
+        self.objects = []
+
+    def __len__(self):
+        return len(self.objects)
+
+    def append(self, payload):
+        self.objects.append(payload)
+        return len(self.objects) - 1
+
+    def get(self, idx, surface):
+        return self.objects[idx]
 
 
 class Trie(object):
@@ -14,31 +39,286 @@ class Trie(object):
 
     Data Structure for saving tokens with
     morphological analysis results by Mecab-ko-dic
+
+    Keys are stored in a double-array: child of node `s` on character code `c`
+    is the slot `base[s] + c`, valid only if `check[base[s] + c] == s`, and
+    `value[s]` is the id of the key ending at `s` (or -1).
+    Payloads are kept in a side table (`ObjectTable` or `EntryTable`),
+    entries of key `k` are chained from `key_head[k]` through `entry_next`.
     """
 
-    def __init__(self):
-        self.head = Node(key=None)
+    def __init__(self, table=None):
+        self.table = ObjectTable() if table is None else table
+        self.codes = {}
+        self.base = array("i", [0])
+        self.check = array("i", [-1])
+        self.value = array("i", [-1])
+        self.key_head = array("i")
+        self.entry_next = array("i")
+        self.used = bytearray(1)
+        self.next_free = 1
+        self.nodes = {}
+
+    @staticmethod
+    def load(alphabet, base, check, value, key_head, entry_next, table):
+        """
+        Create trie from prebuilt arrays (e.g. memoryviews of a compiled dictionary).
+
+        Args:
+            alphabet (Sequence[int]): codepoint of the character whose code is i + 1
+        """
+        trie = Trie(table)
+        trie.codes = {chr(c): i + 1 for i, c in enumerate(alphabet)}
+        trie.base, trie.check, trie.value = base, check, value
+        trie.key_head, trie.entry_next = key_head, entry_next
+        return trie
+
+    @staticmethod
+    def build(items, table=None):
+        """
+        Build trie from many (key, payload) pairs at once.
+
+        Much faster than `__setitem__` one by one,
+        because every node is placed only once without relocation.
+        """
+        groups = {}
+        for string, result in items:
+            same_key = groups.setdefault(string, [])
+            if result not in same_key:
+                same_key.append(result)
+
+        trie = Trie(table)
+        keys = sorted(groups.keys())
+        trie._build(keys)
+        for key in keys:
+            prev = -1
+            for result in groups[key]:
+                idx = trie._append(result)
+                if prev == -1:
+                    trie.key_head.append(idx)
+                else:
+                    trie.entry_next[prev] = idx
+                prev = idx
+        return trie
+
+    @property
+    def alphabet(self):
+        """Codepoints of the characters ordered by their codes."""
+        return [ord(c) for c, _ in sorted(self.codes.items(), key=lambda x: x[1])]
 
     def __getitem__(self, string):
-        cur_node = self.head
+        key_id = self._find(string)
+        if key_id < 0:
+            return None
+        return self._node(key_id, string)
+
+    def __setitem__(self, string, result):
+        cur_node = self._insert(string)
+        key_id = self.value[cur_node]
+        if key_id < 0:
+            self.value[cur_node] = len(self.key_head)
+            self.key_head.append(self._append(result))
+            return
+
+        idx = self.key_head[key_id]
+        while True:
+            if self.table.get(idx, string) == result:
+                return
+            if self.entry_next[idx] == -1:
+                break
+            idx = self.entry_next[idx]
+
+        self.entry_next[idx] = self._append(result)
+        self.nodes.pop(key_id, None)
+
+    def prefix_search(self, string, start=0):
+        """Find every token that is a prefix of `string[start:]`.
+
+        Walks the trie once from `start` and stops as soon as the path dies,
+        so cost is bounded by the longest token, not the length of the string.
+
+        Yields:
+            (end, node) where `string[start:end]` is the matched token.
+        """
+        codes, base, check, value = self.codes, self.base, self.check, self.value
+        size = len(check)
+        cur_node = 0
+        for end in range(start, len(string)):
+            code = codes.get(string[end])
+            if code is None:
+                return
+
+            next_node = base[cur_node] + code
+            if next_node >= size or check[next_node] != cur_node:
+                return
+            cur_node = next_node
+
+            key_id = value[cur_node]
+            if key_id >= 0:
+                node = self.nodes.get(key_id)
+                if node is None:
+                    node = self._node(key_id, string[start : end + 1])
+                yield end + 1, node
+
+    def _node(self, key_id, string):
+        node = self.nodes.get(key_id)
+        if node is None:
+            node = Node(key=None, data=string)
+            idx = self.key_head[key_id]
+            while idx != -1:
+                node.result.append(self.table.get(idx, string))
+                idx = self.entry_next[idx]
+            self.nodes[key_id] = node
+        return node
+
+    def _append(self, result):
+        self.entry_next.append(-1)
+        return self.table.append(result)
+
+    def _find(self, string):
+        codes, base, check = self.codes, self.base, self.check
+        size = len(check)
+        cur_node = 0
         for char_key in string:
-            if char_key in cur_node.children:
-                cur_node = cur_node.children[char_key]
-            else:
-                return None
+            code = codes.get(char_key)
+            if code is None:
+                return -1
 
-        if cur_node.data is not None:
-            return cur_node
-        return None
+            next_node = base[cur_node] + code
+            if next_node >= size or check[next_node] != cur_node:
+                return -1
+            cur_node = next_node
 
-    def __setitem__(self, string, result):
-        cur_node = self.head
+        return self.value[cur_node]
+
+    def _grow(self, size):
+        if size > len(self.check):
+            size = max(size, len(self.check) * 2)
+            self.base.extend(repeat(0, size - len(self.base)))
+            self.check.extend(repeat(-1, size - len(self.check)))
+            self.value.extend(repeat(-1, size - len(self.value)))
+            self.used.extend(bytes(size - len(self.used)))
+
+    def _find_base(self, codes):
+        """Find the smallest offset where every child slot is free."""
+        used = self.used
+        first, last = min(codes), max(codes)
+        start = pos = max(first, self.next_free)
+        num_free = 0
+        while True:
+            pos = used.find(0, pos)
+            if pos == -1:
+                pos = len(used)
+            num_free += 1
+            offset = pos - first
+            self._grow(offset + last + 1)
+            if all(not used[offset + code] for code in codes):
+                break
+            pos += 1
+
+        # skip the almost full region for the next search.
+        if num_free <= 0.05 * (pos - start + 1):
+            self.next_free = pos
+        return offset
+
+    def _occupy(self, slot, parent):
+        self.check[slot] = parent
+        self.used[slot] = 1
+        if slot == self.next_free:
+            self.next_free = self.used.find(0, slot)
+            if self.next_free == -1:
+                self.next_free = len(self.used)
+
+    def _release(self, slot):
+        self.base[slot], self.check[slot], self.value[slot] = 0, -1, -1
+        self.used[slot] = 0
+        self.next_free = min(self.next_free, slot)
+
+    def _children(self, cur_node):
+        base, check = self.base[cur_node], self.check
+        return [
+            code
+            for code in self.codes.values()
+            if base + code < len(check) and check[base + code] == cur_node
+        ]
+
+    def _insert(self, string):
+        """Get node of the string, adding the missing nodes."""
+        cur_node = 0
         for char_key in string:
-            if char_key not in cur_node.children:
-                cur_node.children[char_key] = Node(char_key)
+            code = self.codes.get(char_key)
+            if code is None:
+                code = self.codes[char_key] = len(self.codes) + 1
+
+            next_node = self.base[cur_node] + code
+            if next_node < len(self.check) and self.check[next_node] == cur_node:
+                cur_node = next_node
+                continue
+
+            if next_node >= len(self.check) or self.check[next_node] != -1:
+                children = self._children(cur_node)
+                offset = self._find_base(children + [code])
+                self._relocate(cur_node, offset, children)
+                next_node = offset + code
+
+            self._grow(next_node + 1)
+            self.base[next_node] = 0
+            self.value[next_node] = -1
+            self._occupy(next_node, cur_node)
+            cur_node = next_node
+
+        return cur_node
+
+    def _relocate(self, cur_node, offset, children):
+        """Move children of the node so that they start from the new offset."""
+        base, check, value = self.base, self.check, self.value
+        old_offset = base[cur_node]
+        for code in children:
+            old, new = old_offset + code, offset + code
+            grandchildren = self._children(old)
+            base[new], value[new] = base[old], value[old]
+            self._occupy(new, cur_node)
+            for grandchild in grandchildren:
+                check[base[old] + grandchild] = new
+            self._release(old)
+        base[cur_node] = offset
+
+    def _build(self, keys):
+        """Place sorted, distinct and non-empty keys. Id of a key is its index."""
+        if len(keys) == 0:
+            return
+
+        # frequent characters get small codes, so that wide nodes stay compact.
+        frequency = Counter(c for key in keys for c in key)
+        self.codes = {
+            char_key: i + 1
+            for i, char_key in enumerate(
+                sorted(frequency.keys(), key=lambda c: (-frequency[c], c))
+            )
+        }
+        base, check, value = self.base, self.check, self.value
+
+        stack = [(0, 0, len(keys), 0)]
+        while len(stack) != 0:
+            cur_node, lo, hi, depth = stack.pop()
+            if len(keys[lo]) == depth:
+                value[cur_node] = lo
+                lo += 1
+
+            children, i = [], lo
+            while i < hi:
+                char_key, j = keys[i][depth], i + 1
+                while j < hi and keys[j][depth] == char_key:
+                    j += 1
+                children.append((self.codes[char_key], i, j))
+                i = j
 
-            cur_node = cur_node.children[char_key]
+            if len(children) == 0:
+                continue
 
-        cur_node.data = string
-        if result not in cur_node.result:
-            cur_node.result.append(result)
+            offset = self._find_base([code for code, _, _ in children])
+            base[cur_node] = offset
+            for code, i, j in children:
+                self._occupy(offset + code, cur_node)
+            for code, i, j in reversed(children):
+                stack.append((offset + code, i, j, depth + 1))
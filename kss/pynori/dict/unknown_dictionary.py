@@ -1,4 +1,5 @@
 from kss.pynori.dict.dictionary import Dictionary
+from kss.pynori.dict.entry_table import EntryTable
 from kss.pynori.dict.trie import Trie
 from kss.pynori.pos import POS
 
@@ -23,17 +24,30 @@ class UnknownDictionary(Dictionary):
         else:
             return UnknownDictionary(entries)
 
-    def __init__(self, entries):
+    @staticmethod
+    def load(compiled):
+        table = EntryTable.load(compiled)
+        unkTrie = Trie(EntryTable())
+        for key, idx in zip(compiled["unk_keys"], compiled["unk_entries"]):
+            category = table.string(key)
+            unkTrie[category] = table.get(idx, category)
+        return UnknownDictionary(unkTrie=unkTrie)
+
+    def __init__(self, entries=None, unkTrie=None):
         super().__init__()
+        if unkTrie is not None:
+            self.unkTrie = unkTrie
+            return
+
         entries = sorted(entries)
-        self.unkTrie = Trie()
+        self.unkTrie = Trie(EntryTable())
 
         for entry in entries:
             splits = entry.split(",")
             morph_inf = dict()
             morph_inf["surface"] = splits[0]
-            morph_inf["left_id"] = splits[1]
-            morph_inf["right_id"] = splits[2]
+            morph_inf["left_id"] = int(splits[1])
+            morph_inf["right_id"] = int(splits[2])
             morph_inf["word_cost"] = int(splits[3])
             morph_inf["POS"] = splits[4]
             morph_inf["POS_type"] = POS.Type.MORPHEME
@@ -1,5 +1,6 @@
 from kss.pynori.dict.dictionary import Dictionary
 from kss.pynori.dict.character_definition import CharacterDefinition
+from kss.pynori.dict.entry_table import EntryTable
 from kss.pynori.dict.trie import Trie
 from kss.pynori.pos import POS
 
@@ -33,7 +34,7 @@ class UserDictionary(Dictionary):
     def __init__(self, entries):
         char_def = CharacterDefinition()
         entries = sorted(entries, reverse=True)
-        self.userTrie = Trie()
+        self.userTrie = Trie(EntryTable())
         last_token = ""
 
         for entry in entries:
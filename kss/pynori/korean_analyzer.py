@@ -1,5 +1,5 @@
 from kss.pynori.korean_posstop_filter import KoreanPOSStopFilter
-from kss.pynori.korean_tokenizer import KoreanTokenizer
+from kss.pynori.korean_tokenizer import DictProfile, KoreanTokenizer
 from kss.pynori.korean_tokenizer import Type
 from kss.pynori.post_processing import PostProcessing
 from kss.pynori.synonym_graph_filter import SynonymGraphFilter
@@ -25,6 +25,7 @@ class KoreanAnalyzer(object):
         stop_tags=KoreanPOSStopFilter.DEFAULT_STOP_TAGS,
         synonym_filter=False,
         mode_synonym=False,
+        dict_profile=DictProfile.FULL,
     ):
         self.post_processor = PostProcessing()
         self.kor_tokenizer = KoreanTokenizer(
@@ -33,6 +34,7 @@ class KoreanAnalyzer(object):
             infl_decompound_mode,
             output_unknown_unigrams,
             discard_punctuation,
+            dict_profile,
         )
         self.pos_filter = pos_filter
         self.kor_pos_filter = KoreanPOSStopFilter(stop_tags=stop_tags)
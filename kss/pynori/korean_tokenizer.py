@@ -1,7 +1,7 @@
 import gc
 import os
-import sys
 import unicodedata
+from array import array
 
 from kss.pynori.char_unicode import (
     SPACE_SEPARATOR,
@@ -22,6 +22,7 @@ from kss.pynori.char_unicode import (
     INITIAL_QUOTE_PUNCTUATION,
     FINAL_QUOTE_PUNCTUATION,
 )
+from kss.pynori.dict.compiled_dictionary import CompiledDictionary
 from kss.pynori.dict.connection_costs import ConnectionCosts
 from kss.pynori.dict.user_dictionary import UserDictionary
 from kss.pynori.dict.known_dictionary import KnownDictionary
@@ -36,6 +37,10 @@ from kss.pynori.pos import POS
 from kss.pynori.token_attribute import TokenAttribute
 
 PATH_CUR = os.path.dirname(__file__)
+PATH_COMPILED_DICT = {
+    "full": "/resources/bin_mecab_dic/mecab_dic.bin",
+    "segmentation": "/resources/bin_mecab_dic/mecab_dic_seg.bin",
+}
 
 
 class Type(object):
@@ -54,6 +59,13 @@ class DcpdMode(object):
     MIXED = "MIXED"
 
 
+class DictProfile(object):
+    """Dictionary profile: which entries of mecab-ko-dic are compiled"""
+
+    FULL = "full"
+    SEGMENTATION = "segmentation"  # reduced for sentence segmentation
+
+
 class KoreanTokenizer(object):
     """Tokenizer for Korean text.
 
@@ -73,6 +85,11 @@ class KoreanTokenizer(object):
     discard_punctuation : {'True', 'False'}
             true if punctuation tokens should be dropped from the output.
 
+    dict_profile : {'full', 'segmentation'}
+            which compiled dictionary to load. 'segmentation' has no proper nouns
+            and no decompounding information, it is built by
+            `python -m kss.pynori.build_dict --profile segmentation`.
+
     Notes
     -----
     This tokenizer uses a rolling viterbi search to find
@@ -90,7 +107,12 @@ class KoreanTokenizer(object):
         infl_decompound_mode,
         output_unknown_unigrams,
         discard_punctuation,
+        dict_profile=DictProfile.FULL,
     ):
+        assert dict_profile in PATH_COMPILED_DICT, (
+            f"param `dict_profile` must be one of {list(PATH_COMPILED_DICT.keys())}, "
+            f"but you input {dict_profile}"
+        )
         self.mode = decompound_mode
         self.infl_mode = infl_decompound_mode
         self.output_unknown_unigrams = output_unknown_unigrams
@@ -98,17 +120,31 @@ class KoreanTokenizer(object):
 
         gc.disable()
         self.buffer = KoreanTokenizer.Buffer()
+        self.positions = KoreanTokenizer.WrappedPositionArray()
         self.character_definition = CharacterDefinition()
         self.user_dict = UserDictionary.open(PATH_CUR + path_userdict)
-        self.unk_dict = UnknownDictionary.open(
-            PATH_CUR + "/resources/mecab-ko-dic-2.1.1-20180720/unk.def"
-        )
-        self.kn_dict = KnownDictionary.open(
-            PATH_CUR + "/resources/pkl_mecab_csv/mecab_csv.pkl"
-        )
-        self.conn_costs = ConnectionCosts.open(
-            PATH_CUR + "/resources/pkl_mecab_matrix/matrix_def.pkl"
-        )
+        path_dict = PATH_CUR + PATH_COMPILED_DICT[dict_profile]
+        if os.path.exists(path_dict):
+            compiled = CompiledDictionary.open(path_dict)
+            self.unk_dict = UnknownDictionary.load(compiled)
+            self.kn_dict = KnownDictionary.load(compiled)
+            self.conn_costs = ConnectionCosts.load(compiled)
+        elif dict_profile != DictProfile.FULL:
+            raise FileNotFoundError(
+                f"can not find '{path_dict}'. please build it with "
+                f"`python -m kss.pynori.build_dict --profile {dict_profile}`."
+            )
+        else:
+            # legacy pickles, used until the compiled dictionary is built.
+            self.unk_dict = UnknownDictionary.open(
+                PATH_CUR + "/resources/mecab-ko-dic-2.1.1-20180720/unk.def"
+            )
+            self.kn_dict = KnownDictionary.open(
+                PATH_CUR + "/resources/pkl_mecab_csv/mecab_csv.pkl"
+            )
+            self.conn_costs = ConnectionCosts.open(
+                PATH_CUR + "/resources/pkl_mecab_matrix/matrix_def.pkl"
+            )
         self.reset_state()
         gc.enable()
 
@@ -120,7 +156,7 @@ class KoreanTokenizer(object):
         self.pos = 0
         self.end = False
         self.last_backtrace_pos = 0
-        self.positions = KoreanTokenizer.WrappedPositionArray()
+        self.positions.reset()
         self.tkn_attr_obj = TokenAttribute()
         self.pending = []
         self.positions.get(0).add(0, 0, -1, -1, -1, -1, Type.KNOWN, None, None, None)
@@ -157,21 +193,51 @@ class KoreanTokenizer(object):
             return self.in_string[start_pos:end_pos_plus1]
 
     class Position(object):
-        """Holds all back pointers arriving to this position."""
+        """Holds all back pointers arriving to this position.
+
+        Back pointers are kept in parallel columns which only grow
+        (geometrically), so a position can be reused by resetting `count`.
+        Numeric columns are arrays and the others are lists.
+        """
+
+        NUMERIC_COLUMNS = {
+            "costs": "q",
+            "lastRightID": "i",
+            "backPos": "i",
+            "backWordPos": "i",
+            "backIndex": "i",
+        }
+        OBJECT_COLUMNS = [
+            "backID",
+            "backDictType",
+            "backPosType",
+            "morphemes",
+            "backPosTag",
+        ]
 
         def __init__(self):
             self.pos = 0
             self.count = 0
-            self.costs = []
-            self.lastRightID = []
-            self.backPos = []
-            self.backWordPos = []
-            self.backIndex = []
+            self.capacity = 0
+            self.costs = array("q")
+            self.lastRightID = array("i")
+            self.backPos = array("i")
+            self.backWordPos = array("i")
+            self.backIndex = array("i")
             self.backID = []
             self.backDictType = []
             self.backPosType = []
             self.morphemes = []
             self.backPosTag = []
+            self.grow()
+
+        def grow(self):
+            size = max(4, self.capacity)
+            for name, typecode in self.NUMERIC_COLUMNS.items():
+                getattr(self, name).frombytes(bytes(size * array(typecode).itemsize))
+            for name in self.OBJECT_COLUMNS:
+                getattr(self, name).extend([None] * size)
+            self.capacity += size
 
         def add(
             self,
@@ -196,22 +262,28 @@ class KoreanTokenizer(object):
             and it means we actually create the full graph
             intersection instead of a "normal" Viterbi lattice:
             """
-            self.costs.append(cost)
-            self.lastRightID.append(lastRightID)
-            self.backPos.append(backPos)
-            self.backWordPos.append(backRPos)
-            self.backIndex.append(backIndex)
-            self.backID.append(backID)
-            self.backDictType.append(backDictType)
-            self.count += 1
-            self.backPosType.append(backPosType)
-            self.morphemes.append(morphemes)
-            self.backPosTag.append(backPosTag)
+            idx = self.count
+            if idx == self.capacity:
+                self.grow()
+
+            self.costs[idx] = cost
+            self.lastRightID[idx] = lastRightID
+            self.backPos[idx] = backPos
+            self.backWordPos[idx] = backRPos
+            self.backIndex[idx] = backIndex
+            self.backID[idx] = backID
+            self.backDictType[idx] = backDictType
+            self.count = idx + 1
+            self.backPosType[idx] = backPosType
+            self.morphemes[idx] = morphemes
+            self.backPosTag[idx] = backPosTag
 
         def reset(self):
             self.count = 0
 
     class WrappedPositionArray(object):
+        """Ring buffer of positions, kept and reused across inputs."""
+
         def __init__(self):
             self.positions = []
             for _ in range(0, 4):
@@ -222,15 +294,7 @@ class KoreanTokenizer(object):
             self.count = 0
 
         def reset(self):
-            self.nextWrite -= 1
-            while self.count > 0:
-                if self.nextWrite == -1:
-                    self.nextWrite = len(self.positions) - 1
-
-                self.positions[self.nextWrite].reset()
-                self.nextWrite -= 1
-                self.count -= 1
-
+            """Positions are reset lazily when `get` hands them out again."""
             self.nextWrite = 0
             self.nextPos = 0
             self.count = 0
@@ -238,26 +302,20 @@ class KoreanTokenizer(object):
         def get(self, pos):
             while pos >= self.nextPos:
                 if self.count == len(self.positions):
-                    self.newPositions = []
-                    for _ in range(0, 1 + self.count):
-                        self.newPositions.append(KoreanTokenizer.Position())
-
-                    self.newPositions[
-                        : len(self.positions) - self.nextWrite
-                    ] = self.positions[
-                        self.nextWrite : len(self.positions) - self.nextWrite
-                    ]
-                    self.newPositions[
-                        len(self.positions) - self.nextWrite : self.nextWrite
-                    ] = self.positions[: self.nextWrite]
-                    self.positions = self.newPositions[:]
+                    # double the ring, the oldest position comes first.
+                    self.positions = (
+                        self.positions[self.nextWrite :]
+                        + self.positions[: self.nextWrite]
+                        + [KoreanTokenizer.Position() for _ in range(self.count)]
+                    )
+                    self.nextWrite = self.count
 
                 if self.nextWrite == len(self.positions):
                     self.nextWrite = 0
 
-                assert self.positions[self.nextWrite].count == 0
-
-                self.positions[self.nextWrite].pos = self.nextPos
+                position = self.positions[self.nextWrite]
+                position.pos = self.nextPos
+                position.count = 0
                 self.nextWrite += 1
                 self.nextPos += 1
                 self.count += 1
@@ -310,23 +368,13 @@ class KoreanTokenizer(object):
         backPosType = trie_dict["POS_type"]
         morphemes = trie_dict["morphemes"]
 
-        leastCost = sys.maxsize
-        leastIDX = -1
         assert fromPosData.count > 0
 
-        for idx in range(0, fromPosData.count):
-            numSpaces = wordPos - fromPosData.pos
-            cost = (
-                fromPosData.costs[idx]
-                + self.conn_costs.get(fromPosData.lastRightID[idx], leftID)
-                + self.compute_space_penalty(leftPOS, numSpaces)
-            )
-
-            if cost < leastCost:
-                leastCost = cost
-                leastIDX = idx
-
-        leastCost += wordCost
+        leastCost, leastIDX = self.conn_costs.relax(
+            fromPosData.costs, fromPosData.lastRightID, fromPosData.count, leftID
+        )
+        numSpaces = wordPos - fromPosData.pos
+        leastCost += self.compute_space_penalty(leftPOS, numSpaces) + wordCost
         self.positions.get(endPos).add(
             cost=leastCost,
             lastRightID=rightID,
@@ -416,20 +464,13 @@ class KoreanTokenizer(object):
 
             if self.user_dict is not None:
                 maxPosAhead = 0
-                posAhead = self.pos
-
-                while True:
-                    ch = self.buffer.get(posAhead)
-                    if ch == -1:
-                        break
-                    userIdRef = self.user_dict.userTrie[
-                        self.buffer.slice_get(self.pos, posAhead + 1)
-                    ]
-                    if userIdRef is not None:
-                        maxPosAhead = posAhead
-                        lastResult = userIdRef.result[0]
-                        anyMatches = True
-                    posAhead += 1
+
+                for end, userIdRef in self.user_dict.userTrie.prefix_search(
+                    self.buffer.in_string, self.pos
+                ):
+                    maxPosAhead = end - 1
+                    lastResult = userIdRef.result[0]
+                    anyMatches = True
 
                 if anyMatches and maxPosAhead > userWordMaxPosAhead:
                     self.add(
@@ -438,26 +479,13 @@ class KoreanTokenizer(object):
                     userWordMaxPosAhead = max(userWordMaxPosAhead, maxPosAhead)
 
             if not anyMatches:
-                posAhead = self.pos
-
-                a = 1
-                while True:
-                    ch = self.buffer.get(posAhead)
-                    if ch == -1:
-                        break
-                    a += 1
-                    wordIdRef = self.kn_dict.sysTrie[
-                        self.buffer.slice_get(self.pos, posAhead + 1)
-                    ]
-
-                    if wordIdRef is not None:
-                        for each in wordIdRef.result:
-                            self.add(
-                                each, posData, self.pos, posAhead + 1, None, Type.KNOWN
-                            )
-                            anyMatches = True
-
-                    posAhead += 1
+                for end, wordIdRef in self.kn_dict.sysTrie.prefix_search(
+                    self.buffer.in_string, self.pos
+                ):
+                    for each in wordIdRef.result:
+                        self.add(each, posData, self.pos, end, None, Type.KNOWN)
+                        anyMatches = True
+
             if unknownWordEndIndex > posData.pos:
                 self.pos += 1
                 continue
@@ -519,18 +547,13 @@ class KoreanTokenizer(object):
 
         if self.pos > 0:
             endPosData = self.positions.get(self.pos)
-            leastCost = sys.maxsize
             leastIDX = -1
 
-            for idx in range(0, endPosData.count):
-                cost = endPosData.costs[idx] + self.conn_costs.get(
-                    endPosData.lastRightID[idx], 0
+            if endPosData.count > 0:
+                _, leastIDX = self.conn_costs.relax(
+                    endPosData.costs, endPosData.lastRightID, endPosData.count, 0
                 )
 
-                if cost < leastCost:
-                    leastCost = cost
-                    leastIDX = idx
-
             self.backtrace(endPosData, leastIDX)
 
     def backtrace(self, endPosData, fromIDX):
@@ -9,7 +9,7 @@
 
 from collections import defaultdict
 from typing import Any
-from kss._emoji import _emojis
+from kss._emoji import _emojis, unicodes
 
 
 class Stats(object):
@@ -32,6 +32,21 @@ class ID(object):
     NEXT2: int = 1 << 4
 
 
+class Symbol(object):
+    NONE: int = 0
+    SPACE: int = 1 << 0
+    DOUBLE_QUOTE: int = 1 << 1
+    SINGLE_QUOTE: int = 1 << 2
+    BRACKET: int = 1 << 3
+    SB: int = 1 << 4
+    DA: int = 1 << 5
+    YO: int = 1 << 6
+    JYO: int = 1 << 7
+    ENDPOINT: int = 1 << 8
+    NOT_ENDPOINT: int = 1 << 9
+    COMMON: int = 1 << 10
+
+
 yo = {
     "가",
     "감",
@@ -1307,27 +1322,6 @@ Table = create_dict(
     default=create_dict({}),
 )
 
-unicodes = []
-unicodes += ["‍"]  # zero width joiner
-unicodes += [
-    "︀",
-    "︁",
-    "︂",
-    "︃",
-    "︄",
-    "︅",
-    "︆",
-    "︇",
-    "︈",
-    "︉",
-    "︊",
-    "︋",
-    "︌",
-    "︍",
-    "︎",
-    "️",
-]  # variation_selectors 1~16
-
 Table[Stats.COMMON].update({e: ID.CONT for e in _emojis.keys()})
 Table[Stats.COMMON].update({e: ID.CONT for e in unicodes})
 
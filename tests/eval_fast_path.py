@@ -0,0 +1,70 @@
+from time import perf_counter
+
+from kss import available_backends
+from kss.base import Preprocessor, Tokens, _morph
+from kss.kss import _split_eojeols, _split_eojeols_by_candidates, _split_eojeols_unquoted
+
+
+def load_tokens(lines, backend):
+    use_morpheme = backend != "none"
+    if backend == "pynori":
+        _morph.create_pynori()
+
+    tokens = []
+    for line in lines:
+        text = Preprocessor(use_morpheme).backup(
+            line, ec_cases=not use_morpheme, emojis=backend == "pynori"
+        )
+        if use_morpheme:
+            tokens.append(_morph.pos(text=text, backend=backend))
+        else:
+            tokens.append(Tokens.from_text(text, "EF+ETN"))
+    return tokens
+
+
+def throughput(split, tokens, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = perf_counter()
+        for _tokens in tokens:
+            split(_tokens)
+        best = min(best, perf_counter() - t)
+
+    return sum(len(_tokens) for _tokens in tokens) / best
+
+
+if __name__ == "__main__":
+    lines = []
+    for name in ["code_example.txt", "news_example.txt", "test_sooftware.txt", "test_uoneway.txt"]:
+        lines += [line for line in open(name, "r", encoding="utf-8").read().splitlines() if line.strip()]
+
+    for backend in ["none", "mecab", "pynori"]:
+        if backend not in available_backends():
+            continue
+
+        use_morpheme = backend != "none"
+        tokens = load_tokens(lines, backend)
+
+        for use_heuristic in [True, False]:
+            generic = throughput(
+                lambda t: _split_eojeols(t, use_heuristic, False, use_morpheme),
+                tokens,
+            )
+            fast = throughput(
+                lambda t: _split_eojeols_unquoted(t, use_heuristic, use_morpheme),
+                tokens,
+            )
+            message = (
+                f"backend={backend}, use_heuristic={use_heuristic}: "
+                f"generic={generic / 1e6:.2f}M chars/s, "
+                f"unquoted={fast / 1e6:.2f}M chars/s ({fast / generic:.2f}x)"
+            )
+
+            if not use_morpheme:
+                candidates = throughput(
+                    lambda t: _split_eojeols_by_candidates(t.text, use_heuristic),
+                    tokens,
+                )
+                message += f", candidates={candidates / 1e6:.2f}M chars/s ({candidates / generic:.2f}x)"
+
+            print(message)
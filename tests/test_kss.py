@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 import json
 import unittest
+from unittest import mock
+from pathlib import Path
 from time import time
 import kss
 
@@ -203,3 +205,541 @@ class KssTest(unittest.TestCase):
         print(f"mecab: {kss.split_sentences(test, backend='mecab')}")
         print(f"none: {kss.split_sentences(test, backend='none')}")
         print(f"pynori: {kss.split_sentences(test, backend='pynori')}")
+
+    def test_backup_restore(self):
+        from kss.base import Preprocessor
+
+        for use_morpheme in [True, False]:
+            text = "그는 말했다. I'm good 괜찮아요. 1990's 우간다에 가다가 He’s :) 먹이다 ‘👍🏽’"
+            prep = Preprocessor(use_morpheme=use_morpheme)
+            masked = prep.backup(
+                text, ec_cases=not use_morpheme, emojis=True, quotes=True
+            )
+            self.assertNotIn("I'm", masked)
+            self.assertNotIn("He’s", masked)
+            self.assertIn("\u200b’\u200b", masked)
+            self.assertEqual(prep.restore(masked).replace("\u200b", ""), text)
+
+    def test_heuristic(self):
+        from kss.base import Postprocessor
+        from kss.rule import post_processing_jyo, post_processing_yo
+
+        text = "정말 별로 가요 그래서 저 갔죠 '인용' 가요 "
+        self.assertTrue("별로 가요 " in post_processing_yo)
+        self.assertTrue("로 가요 " in post_processing_yo)
+        self.assertTrue("저 갔죠 " in post_processing_jyo)
+
+        # `별로` and `로` end at the same position,
+        # and a sentence with quotes is not split.
+        self.assertEqual(
+            Postprocessor().apply_heuristic(text, [text[:18], text[18:]], True),
+            ["정말 별로 가요 ", "", "그래서 저 갔죠 ", "", "'인용' 가요 "],
+        )
+
+    def test_unquoted_fast_path(self):
+        from kss.base import Preprocessor, Tokens, _morph
+        from kss.kss import _split_eojeols, _split_eojeols_by_candidates, _split_eojeols_unquoted
+
+        lines = []
+        for name in ["code_example.txt", "news_example.txt", "test_sooftware.txt", "test_uoneway.txt"]:
+            lines += open(name, "r", encoding="utf-8").read().splitlines()
+
+        for backend in ["none", "mecab"]:
+            if backend not in kss.available_backends():
+                continue
+
+            use_morpheme = backend != "none"
+            for line in lines:
+                text = Preprocessor(use_morpheme).backup(line, ec_cases=not use_morpheme)
+                if use_morpheme:
+                    tokens = _morph.pos(text=text, backend=backend)
+                else:
+                    tokens = Tokens.from_text(text, "EF+ETN")
+
+                for use_heuristic in [True, False]:
+                    expected = _split_eojeols(tokens, use_heuristic, False, use_morpheme)[0]
+                    self.assertEqual(
+                        _split_eojeols_unquoted(tokens, use_heuristic, use_morpheme),
+                        expected,
+                    )
+
+                    if not use_morpheme:
+                        self.assertEqual(
+                            Preprocessor.tostring(_split_eojeols_by_candidates(tokens.text, use_heuristic)),
+                            Preprocessor.tostring(expected),
+                        )
+
+    def test_preprocess_text(self):
+        from kss.base import preprocess_text
+
+        text = "이모지 ❤️❤️\x00 하트\x07입니다.  👍🏻 🇰🇷 a‍b"
+        self.assertEqual(preprocess_text(text), "이모지 ❤️❤️ 하트입니다. 👍🏻 🇰🇷 a‍b")
+
+    def test_trie_prefix_search(self):
+        from kss.pynori.dict.trie import Trie
+
+        trie = Trie()
+        for word in ["대", "대한", "대한민국", "민국"]:
+            trie[word] = {"surface": word}
+
+        matches = [(end, node.data) for end, node in trie.prefix_search("우리 대한민국만세", 3)]
+        self.assertEqual(matches, [(4, "대"), (5, "대한"), (7, "대한민국")])
+        self.assertEqual(list(trie.prefix_search("우리", 0)), [])
+
+    def test_double_array_trie(self):
+        from kss.pynori.dict.dictionary import Dictionary
+        from kss.pynori.dict.entry_table import EntryTable
+        from kss.pynori.dict.trie import Trie
+
+        words = ["가", "가나", "나", "가다", "다가", "가나다", "나가", "a", "가a"]
+        trie = Trie.build([(word, i) for i, word in enumerate(words[:3])])
+        for i, word in enumerate(words[3:], 3):  # relocates the built nodes
+            trie[word] = i
+        trie["가나"] = 1
+        trie["가나"] = 10
+
+        for i, word in enumerate(words):
+            self.assertEqual(trie[word].data, word)
+        self.assertEqual(trie["가나"].result, [1, 10])
+        self.assertIsNone(trie["가나다라"])
+        self.assertEqual(
+            [(end, node.data) for end, node in trie.prefix_search("가나다라", 0)],
+            [(1, "가"), (2, "가나"), (3, "가나다")],
+        )
+
+        trie = Trie(EntryTable())
+        trie["대한민국"] = {
+            "surface": "대한민국",
+            "left_id": 1,
+            "right_id": 2,
+            "word_cost": -100000,
+            "POS": "NNG",
+            "POS_type": "COMP",
+            "morphemes": [
+                Dictionary.Morpheme(posTag="NNG", surfaceForm="대한"),
+                Dictionary.Morpheme(posTag="NNG", surfaceForm="민국"),
+            ],
+        }
+        result = trie["대한민국"].result[0]
+        self.assertEqual(result["word_cost"], -100000)
+        self.assertEqual(result["POS_type"], "COMP")
+        self.assertEqual(
+            [(m.posTag, m.surfaceForm) for m in result["morphemes"]],
+            [("NNG", "대한"), ("NNG", "민국")],
+        )
+
+    def test_compiled_dictionary(self):
+        import os
+        import tempfile
+
+        from kss.pynori.build_dict import build_dictionary, PATH_DIC
+        from kss.pynori.dict.compiled_dictionary import (
+            CompiledDictionary,
+            write_compiled_dictionary,
+        )
+        from kss.pynori.dict.connection_costs import ConnectionCosts
+        from kss.pynori.dict.known_dictionary import KnownDictionary
+        from kss.pynori.dict.unknown_dictionary import UnknownDictionary
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "NNG.csv"), "w", encoding="utf-8") as f:
+                f.write("대,1,2,100,NNG,*,F,대,*,*,*,*\n")
+                # out of int16, like the cost of user dictionary entries
+                f.write("대한,1,2,-100000,NNP,*,T,대한,*,*,*,*\n")
+                f.write("대한민국,1,2,300,NNP,*,T,대한민국,Compound,*,*,대한/NNP/*+민국/NNG/*\n")
+                f.write("대한민국,1,2,300,NNP,*,T,대한민국,Compound,*,*,대한/NNP/*+민국/NNG/*\n")
+            with open(os.path.join(tmp, "unk.def"), "w", encoding="utf-8") as f:
+                f.write(open(os.path.join(PATH_DIC, "unk.def"), encoding="utf-8").read())
+            with open(os.path.join(tmp, "matrix.def"), "w", encoding="utf-8") as f:
+                f.write("3 2\n0 0 1\n0 1 -2\n2 1 3\n")
+
+            path = os.path.join(tmp, "dic.bin")
+            write_compiled_dictionary(
+                path, build_dictionary(tmp, os.path.join(tmp, "matrix.def"))
+            )
+            compiled = CompiledDictionary.open(path)
+            kn_dict = KnownDictionary.load(compiled)
+            conn_costs = ConnectionCosts.load(compiled)
+            unk_dict = UnknownDictionary.load(compiled)
+
+            matches = [
+                (end, node.data)
+                for end, node in kn_dict.sysTrie.prefix_search("우리 대한민국만세", 3)
+            ]
+            self.assertEqual(matches, [(4, "대"), (5, "대한"), (7, "대한민국")])
+            self.assertIsNone(kn_dict.sysTrie["대한민"])
+
+            self.assertEqual(kn_dict.sysTrie["대한"].result[0]["word_cost"], -100000)
+            result = kn_dict.sysTrie["대한민국"].result
+            self.assertEqual(len(result), 1)
+            self.assertEqual(result[0]["POS_type"], "COMP")
+            self.assertEqual(
+                [(m.posTag, m.surfaceForm) for m in result[0]["morphemes"]],
+                [("NNP", "대한"), ("NNG", "민국")],
+            )
+            self.assertEqual(
+                [conn_costs.get(0, 1), conn_costs.get(2, 1), conn_costs.get(1, 0)],
+                [-2, 3, 0],
+            )
+            self.assertEqual(unk_dict.unkTrie["HANGUL"].result[0]["POS"], "UNKNOWN")
+
+    def test_segmentation_profile(self):
+        from kss.pynori.build_dict import segmentation_entries
+        from kss.pynori.dict.dictionary import Dictionary
+
+        def entry(surface, pos, cost, morphemes=None):
+            return surface, {
+                "surface": surface,
+                "left_id": 1,
+                "right_id": 2,
+                "word_cost": cost,
+                "POS": pos,
+                "POS_type": "COMP" if morphemes else "MORP",
+                "morphemes": morphemes,
+            }
+
+        entries = [
+            entry("대한", "NNP", 200),
+            entry("대한민국", "NNP", 300),
+            entry("대한민국임시정부", "NNP", 100),
+            entry("가방", "NNG", 50, [Dictionary.Morpheme("NNG", "가방")]),
+            entry("가방", "NNG", 40),
+        ]
+        result = [
+            (surface, e["word_cost"], e["POS_type"], e["morphemes"])
+            for surface, e in segmentation_entries(entries)
+        ]
+        self.assertEqual(
+            result,
+            [
+                ("대한", 200, "MORP", None),
+                ("대한민국", 300, "MORP", None),
+                ("가방", 40, "MORP", None),
+            ],
+        )
+
+    def test_connection_costs(self):
+        from array import array
+
+        from kss.pynori.dict.connection_costs import ConnectionCosts
+
+        # 3 right ids x 2 left ids
+        conn_costs = ConnectionCosts(array("h", [1, -2, 3, 4, 0, 9]), 2)
+        self.assertEqual(conn_costs.get(1, 0), 3)
+        self.assertEqual(conn_costs.relax([10, 5, 7], [0, 1, 2], 3, 1), (8, 0))
+        self.assertEqual(conn_costs.relax([10, 5, 7], [0, 1, 2], 2, 0), (8, 1))
+
+        conn_costs.NUMPY_MIN_COUNT = 0  # no-op without numpy
+        self.assertEqual(conn_costs.relax([10, 5, 7], [0, 1, 2], 3, 1), (8, 0))
+        self.assertEqual(conn_costs.relax([3, 5, 3], [2, 1, 2], 3, 0), (3, 0))
+
+    def test_lattice_reuse(self):
+        from kss.pynori.korean_tokenizer import KoreanTokenizer
+
+        positions = KoreanTokenizer.WrappedPositionArray()
+        for pos in range(10):  # grows the ring and the columns
+            for i in range(pos):
+                positions.get(pos).add(i, i, pos, pos, i, "", "KN", "MORP", None, "NNG")
+        storage = list(positions.positions)
+        self.assertEqual(positions.get(9).count, 9)
+        self.assertEqual(list(positions.get(9).costs[:3]), [0, 1, 2])
+
+        positions.reset()
+        self.assertEqual(positions.get(3).count, 0)
+        positions.get(3).add(7, 0, 0, 0, 0, "", "KN", "MORP", None, "NNG")
+        self.assertEqual((positions.get(3).pos, positions.get(3).count), (3, 1))
+        self.assertEqual(positions.get(3).costs[0], 7)
+        self.assertEqual(positions.positions, storage)
+
+    def test_splitter(self):
+        texts = ["안녕하세요.\n반가워요.", "좋아요. 싫어요."]
+
+        with kss.Splitter(backend="none", num_workers=2) as splitter:
+            self.assertEqual(
+                splitter.split_batch(texts),
+                kss.split_sentences(texts, backend="none", num_workers=2),
+            )
+            pool = splitter.pool
+            splitter.split_batch(texts)
+            self.assertIs(splitter.pool, pool)
+            self.assertEqual(splitter.split("좋아요. 싫어요."), ["좋아요.", "싫어요."])
+
+        self.assertIsNone(splitter.pool)
+
+    def test_scheduler(self):
+        from kss.kss import _schedule_batches
+
+        self.assertEqual(
+            _schedule_batches([3, 10, 1, 2, 4], budget=5),
+            [[1], [4], [0, 3], [2]],
+        )
+
+        texts = ["좋아요. 싫어요."] * 7 + ["안녕하세요. 반가워요. 잘 지내요?"]
+        with kss.Splitter(backend="none", num_workers=2, chars_per_task=20) as splitter:
+            self.assertEqual(
+                splitter.split_batch(texts),
+                kss.split_sentences(texts, backend="none", num_workers=1),
+            )
+            self.assertEqual(splitter.stats.segments, len(texts))
+            self.assertEqual(splitter.stats.chars, sum(len(t) for t in texts))
+            self.assertGreater(splitter.stats.bytes, splitter.stats.chars)
+            self.assertGreaterEqual(splitter.stats.tasks, 4)
+            self.assertLessEqual(len(splitter.stats.busy_time), 2)
+
+    def test_cache(self):
+        import os
+        import tempfile
+
+        from kss.cache import Cache
+
+        class BrokenCache(Cache):
+            def get(self, key):
+                return None
+
+        # a cache without `put` fails when it's created, not in a worker
+        with self.assertRaises(TypeError):
+            BrokenCache()
+
+        cache = kss.MemoryCache(max_bytes=800)
+        cache.put(cache.digest("a"), ["가" * 100])
+        cache.put(cache.digest("b"), ["나" * 100])
+        self.assertEqual(cache.get(cache.digest("a")), ["가" * 100])
+        self.assertIsNone(cache.get(cache.digest("a", "option")))
+        cache.put(cache.digest("c"), ["다" * 100])
+        self.assertIsNone(cache.get(cache.digest("b")))
+        self.assertEqual(cache.counters(), (1, 2, 1))
+        self.assertLessEqual(cache.size, 800)
+
+        texts = ["좋아요. 싫어요.", "안녕하세요. 반가워요.", "좋아요. 싫어요."]
+        expected = kss.split_sentences(texts, backend="none", num_workers=1)
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, "kss.db")
+            for num_workers in [1, 2]:
+                cache = kss.SqliteCache(path)
+                with kss.Splitter(
+                    backend="none", num_workers=num_workers, cache=cache
+                ) as splitter:
+                    self.assertEqual(splitter.split_batch(texts), expected)
+
+            # the second splitter found every line stored by the first one
+            self.assertEqual(cache.counters(), (3, 0, 0))
+            self.assertEqual(len(cache), 2)
+
+            cache = kss.SqliteCache(path, max_bytes=60)
+            cache.put(cache.digest("a"), ["가" * 10])
+            self.assertLessEqual(cache.total_size(), 60)
+            self.assertEqual(cache.evictions, 2)
+
+            # a recently used entry is read without writing
+            changes = cache._connect().total_changes
+            self.assertEqual(cache.get(cache.digest("a")), ["가" * 10])
+            self.assertEqual(cache._connect().total_changes, changes)
+
+            # a replaced entry is counted once
+            size = cache.total_size()
+            cache.put(cache.digest("a"), ["가" * 10])
+            self.assertEqual(cache.size, size)
+            self.assertEqual(cache.evictions, 2)
+
+    def test_morph_cache(self):
+        from kss.base import pos_with_cache
+
+        text = "밥을 먹었다 그리고 잠을 잤다 밥을 먹었다"
+        expected = kss.split_sentences(text, backend="pynori")
+
+        morph_cache = kss.MorphCache()
+        for _ in range(2):
+            self.assertEqual(
+                kss.split_sentences(
+                    text,
+                    backend="pynori",
+                    cache=kss.MemoryCache(max_bytes=0),
+                    morph_cache=morph_cache,
+                ),
+                expected,
+            )
+
+        # `밥을` and `먹었다` have different neighbor eojeols at the beginning and the end of text
+        self.assertEqual(len(morph_cache), 7)
+        self.assertEqual(morph_cache.counters(), (7, 7, 0))
+        self.assertEqual(morph_cache.hit_rate, 0.5)
+
+        # spaces which the analyzer doesn't keep aren't cached
+        pos_with_cache(" 밥을  먹었다", "pynori", morph_cache)
+        self.assertEqual(len(morph_cache), 7)
+
+        morph_cache = kss.MorphCache(max_bytes=1000)
+        pos_with_cache(text, "pynori", morph_cache)
+        self.assertLessEqual(morph_cache.size, 1000)
+        self.assertGreater(morph_cache.evictions, 0)
+
+        # cached analysis gives the same sentences as analysis of the whole text
+        lines = []
+        for name in ["news_example.txt", "test_sooftware.txt"]:
+            lines += [line for line in open(name, "r", encoding="utf-8").read().splitlines() if line.strip()]
+
+        for backend in ["pynori", "mecab"]:
+            if backend not in kss.available_backends():
+                continue
+
+            expected = kss.split_sentences(
+                lines, backend=backend, num_workers=1, cache=kss.MemoryCache(max_bytes=0)
+            )
+            morph_cache = kss.MorphCache()
+            for _ in range(2):  # with the cold and the warm cache
+                out = kss.split_sentences(
+                    lines,
+                    backend=backend,
+                    num_workers=1,
+                    cache=kss.MemoryCache(max_bytes=0),
+                    morph_cache=morph_cache,
+                )
+                self.assertEqual(out, expected)
+
+    def test_regroup_documents(self):
+        texts = ["밥을 먹었다.\n잠을 잤다.", "", "밥을 먹었다."]
+        expected = [["밥을 먹었다.", "잠을 잤다."], [], ["밥을 먹었다."]]
+
+        # the first segment of the first document is the same as the last document
+        for num_workers in [1, 2]:
+            self.assertEqual(
+                kss.split_sentences(texts, backend="none", num_workers=num_workers),
+                expected,
+            )
+        self.assertEqual(
+            kss.split_sentences(texts[0], backend="none", num_workers=1),
+            expected[0],
+        )
+
+    def test_parallel_single_document(self):
+        from kss.kss import _cut_segment
+
+        text = "가나다 라마. 바사 아자차? 카타 파하"
+        self.assertEqual(_cut_segment(text, 12), [(0, 7), (8, 15), (16, 21)])
+        self.assertEqual(_cut_segment("가나다라마바사", 3), [(0, 3), (3, 6), (6, 7)])
+
+        text = " ".join(open("test_uoneway.txt", encoding="utf-8").read().split("\n")[:30])
+        serial = kss.split_sentences(text, backend="none", num_workers=1)
+
+        with kss.Splitter(backend="none", num_workers=2) as splitter:
+            splitter.MAX_PIECE_LENGTH = 300
+            self.assertEqual(splitter.split(text), serial)
+
+    def test_split_sentences_with_offsets(self):
+        text = "안녕하세요.  반가워요.\n\n  잘지냈어요? 저는 치킨이 먹고싶어요."
+        offsets = kss.split_sentences_with_offsets(text, backend="none")
+        self.assertEqual(
+            [text[start:end] for start, end in offsets],
+            ["안녕하세요.", "반가워요.", "잘지냈어요?", "저는 치킨이 먹고싶어요."],
+        )
+
+        texts = [text, "전하 아니되옵니다. 부디 용서하옵소서."]
+        offsets = kss.split_sentences_with_offsets(texts, backend="none")
+        self.assertEqual(len(offsets), 2)
+        self.assertEqual(offsets[1], [(0, 10), (11, 21)])
+
+        # a short str is split in this process like `split_sentences`
+        with mock.patch("kss.kss.Pool", side_effect=AssertionError("pool is created")):
+            kss.split_sentences_with_offsets("안녕하세요. 반가워요.", backend="none")
+            kss.split_chunks("안녕하세요. 반가워요.", max_length=10, backend="none")
+
+    def test_iter_sentences(self):
+        lines = open("test_uoneway.txt", "r", encoding="utf-8").read().splitlines()[:50]
+        expected = [kss.split_sentences(line, backend="none") for line in lines]
+
+        out = kss.iter_sentences(iter(lines), per_document=True, backend="none")
+        self.assertEqual(list(out), expected)
+
+        out = kss.iter_sentences(lines, backend="none", num_workers=2, batch_size=8)
+        self.assertEqual(list(out), sum(expected, []))
+
+        with open("test_uoneway.txt", "r", encoding="utf-8") as f:
+            out = kss.iter_sentences(f, per_document=True, backend="none")
+            self.assertEqual(next(out), expected[0])
+
+        out = kss.iter_sentences(Path("test_uoneway.txt"), per_document=True, backend="none")
+        self.assertEqual(next(out), expected[0])
+
+        # a str is a text in the other functions, so it isn't opened as a path
+        with self.assertRaises(AssertionError):
+            next(kss.iter_sentences("문장입니다. 또 문장.", backend="none"))
+
+    def test_quotes_recovery(self):
+        text = '그가 "안녕. 잘가. 그래. 또 보자. 라고 말했다. 정말? 아니다. 진짜다.'
+        expected = ['그가 "안녕. 잘가.', "그래.", "또 보자.", "라고 말했다.", "정말? 아니다.", "진짜다."]
+
+        out = kss.split_sentences(
+            text, backend="none", use_quotes_brackets_processing=True
+        )
+        self.assertEqual(out, expected)
+
+        # quotes calibration is kept for long documents made of short lines
+        out = kss.split_sentences(
+            ["\n".join([text] * 3)],
+            backend="none",
+            use_quotes_brackets_processing=True,
+            max_recover_length=len(text) + 1,
+            num_workers=2,
+        )
+        self.assertEqual(out, [expected * 3])
+
+        # and for a single line longer than `max_recover_length` of former versions (20000)
+        padding = " ".join(["밥을 먹었다."] * 3000)
+        out = kss.split_sentences(
+            text + " " + padding, backend="none", use_quotes_brackets_processing=True
+        )
+        self.assertEqual(out, expected + ["밥을 먹었다."] * 3000)
+
+        # a given `max_recover_length` still turns it off
+        with self.assertLogs(level="WARNING"):
+            out = kss.split_sentences(
+                text,
+                backend="none",
+                use_quotes_brackets_processing=True,
+                max_recover_length=len(text) - 1,
+            )
+        self.assertNotEqual(out, expected)
+
+    def test_transition_table(self):
+        from kss.base import _table
+        from kss.rule import ID, Stats, Symbol, Table
+
+        for state in [Stats.DA_EOJEOL, Stats.YO, Stats.SB, Stats.COMMON]:
+            for char, flags in list(Table[state].items()):
+                if len(char) == 1:
+                    cls = _table.classes[char]
+                    self.assertEqual(_table.transitions[state][cls], flags)
+
+        self.assertEqual(_table.transitions[Stats.SB][0], ID.NONE)
+        self.assertTrue(_table.symbols[_table.classes["."]] & Symbol.SB)
+        self.assertTrue(_table.symbols[_table.classes["ㅋ"]] & Symbol.COMMON)
+        self.assertFalse(_table.symbols[_table.classes["다"]] & Symbol.COMMON)
+
+    def test_tokens(self):
+        from kss.base import Pos, Tokens, check_pos, get_pos_mask
+
+        self.assertEqual(get_pos_mask("VV+EF"), Pos.EF)
+        self.assertEqual(get_pos_mask("EF+ETN"), Pos.EF | Pos.ETN)
+        self.assertEqual(get_pos_mask("NNG"), Pos.NONE)
+
+        tokens = Tokens.from_pos([("했", "VV+EP"), ("다", "EF"), (" ", "SP"), ("고", "EC")])
+        self.assertEqual(tokens.text, "했다 고")
+        self.assertTrue(check_pos(tokens.tags[1], Pos.EF | Pos.ETN))
+        self.assertFalse(check_pos(tokens.tags[0], Pos.EF))
+
+        sliced = tokens[2:]
+        self.assertEqual(sliced.text, " 고")
+        self.assertEqual(list(sliced.tags), [Pos.SP, Pos.EC])
+
+    def test_available_backends(self):
+        from kss.base import _morph
+
+        backends = kss.available_backends()
+        self.assertIn("pynori", backends)
+        self.assertIn("none", backends)
+
+        if "mecab" in backends:
+            mecab = _morph.mecab
+            kss.split_sentences("안녕하세요. 반가워요.")
+            self.assertIs(_morph.mecab, mecab)
+            self.assertEqual(_morph.resolve_backend("auto"), "mecab")